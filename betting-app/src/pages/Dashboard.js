@@ -154,7 +154,8 @@ const Dashboard = () => {
                 odds: odds,
                 amount: amount,
                 potential_payout: amount + (odds > 0 ? (amount * odds / 100) : (amount * 100 / Math.abs(odds))),
-                commence_time: game.commence_time
+                commence_time: game.commence_time,
+                point: point ?? null
             };
 
             await axios.post(`${API}/bets`, payload, getAuthConfig());
@@ -0,0 +1,232 @@
+"""Micro-benchmarks for the betting backend.
+
+Each benchmark drives the app in-process through httpx's ASGI transport
+against a throwaway SQLite file, so results show event-loop behaviour
+rather than network latency.
+
+    python bench.py login [--users 32] [--rounds 10] [--workers 4]
+    python bench.py bets [--users 50] [--bets 2000] [--concurrency 200] [--delay-ms 2]
+    python bench.py storage [--users 50] [--writes 2000] [--reads 4000] [--concurrency 64]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="viva-bench-"), "bench.db")
+os.environ.setdefault("ODDS_POLLER_ENABLED", "0")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bcrypt  # noqa: E402
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+
+
+def summarize(samples):
+    if not samples:
+        return "no samples"
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return (f"n={len(samples)} p50={statistics.median(samples) * 1000:.1f}ms "
+            f"p99={p99 * 1000:.1f}ms max={samples[-1] * 1000:.1f}ms")
+
+
+async def ping_while(client, done: asyncio.Event, interval: float = 0.005):
+    # Latency counts from when the ping was due, so time spent waiting on a blocked loop is included
+    latencies = []
+    while not done.is_set():
+        due = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        await client.get("/api/health")
+        latencies.append(time.perf_counter() - due)
+    return latencies
+
+
+async def bench_login(args):
+    await server.init_db()
+    hashed = bcrypt.hashpw(b"bench-password", bcrypt.gensalt(args.rounds)).decode()
+    users = [(f"bench-{i}", f"bench-user-{i}") for i in range(args.users)]
+    await server.db_manager.execute_transaction(lambda conn: conn.executemany(
+        "INSERT OR REPLACE INTO users_v2 (id, username, hashed_password, created_at) VALUES (?, ?, ?, '')",
+        [(user_id, username, hashed) for user_id, username in users]
+    ))
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for label, workers in (("inline KDF", 0), (f"process pool ({args.workers} workers)", args.workers)):
+            server.password_hasher.stop()
+            server.password_hasher = server.PasswordHasher(args.rounds, workers, max(1, workers) * 2)
+            server.password_hasher.start()
+            # Warm the pool so worker start-up is not charged to the burst
+            await server.password_hasher.verify("bench-password", hashed)
+
+            done = asyncio.Event()
+            idle = asyncio.create_task(ping_while(client, done))
+            await asyncio.sleep(0.5)
+            done.set()
+            baseline = await idle
+
+            done = asyncio.Event()
+            pings = asyncio.create_task(ping_while(client, done))
+            started = time.perf_counter()
+            responses = await asyncio.gather(*(
+                client.post("/api/token", data={"username": username, "password": "bench-password"})
+                for _, username in users
+            ))
+            elapsed = time.perf_counter() - started
+            done.set()
+            during = await pings
+
+            failed = sum(1 for response in responses if response.status_code != 200)
+            print(f"{label}: {len(users)} logins in {elapsed:.2f}s ({failed} failed)")
+            print(f"  /api/health idle:       {summarize(baseline)}")
+            print(f"  /api/health login burst: {summarize(during)}")
+            print(f"  hasher: {server.password_hasher.stats()}")
+    server.password_hasher.stop()
+    server.db_manager.close()
+
+
+BENCH_BET = {
+    "event_id": "bench-event", "sport_key": "basketball_nba", "sport_title": "NBA",
+    "home_team": "Home", "away_team": "Away", "selected_team": "Home", "bet_type": "h2h",
+    "odds": -110, "amount": 1, "potential_payout": 1.91,
+}
+
+
+async def seed_bettors(prefix: str, count: int):
+    """Create funded users and the open event and line BENCH_BET targets; returns an auth header for each user."""
+    users = [f"{prefix}-{i}" for i in range(count)]
+    commence_time = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    await server.db_manager.execute_transaction(lambda conn: (
+        conn.execute(
+            "INSERT OR REPLACE INTO odds_events (event_id, sport_key, sport_title, commence_time, home_team, away_team) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (BENCH_BET["event_id"], BENCH_BET["sport_key"], BENCH_BET["sport_title"], commence_time,
+             BENCH_BET["home_team"], BENCH_BET["away_team"])
+        ),
+        conn.execute(
+            "INSERT OR REPLACE INTO odds_outcomes (event_id, bookmaker, market, outcome, price, point) "
+            "VALUES (?, 'bench', ?, ?, ?, NULL)",
+            (BENCH_BET["event_id"], BENCH_BET["bet_type"], BENCH_BET["selected_team"], BENCH_BET["odds"])
+        ),
+        conn.executemany(
+            "INSERT OR REPLACE INTO users_v2 (id, username, hashed_password, created_at) VALUES (?, ?, '', '')",
+            [(user_id, user_id) for user_id in users]
+        ),
+        conn.executemany(
+            "INSERT OR REPLACE INTO wallet_v2 (id, user_id, balance, updated_at) VALUES (?, ?, 1e12, '')",
+            [(f"wallet-{user_id}", user_id) for user_id in users]
+        ),
+    ))
+    return [
+        {"Authorization": f"Bearer {server.create_access_token({'sub': user_id, 'user_id': user_id})}"}
+        for user_id in users
+    ]
+
+
+async def run_concurrently(count: int, concurrency: int, request):
+    """Issue count requests with at most concurrency in flight; returns (elapsed, latencies, failures)."""
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with gate:
+            started = time.perf_counter()
+            response = await request(i)
+            latencies.append(time.perf_counter() - started)
+            # Direct database calls return rows rather than a response and count as successes
+            return getattr(response, "status_code", 200)
+
+    started = time.perf_counter()
+    codes = await asyncio.gather(*(one(i) for i in range(count)))
+    return time.perf_counter() - started, latencies, sum(1 for code in codes if code != 200)
+
+
+async def bench_bets(args):
+    await server.init_db()
+    headers = await seed_bettors("bench-bettor", args.users)
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for label, max_batch, delay_ms in (("commit per write", 1, 0.0), ("group commit", server.DB_WRITE_BATCH_MAX, args.delay_ms)):
+            await server.db_manager.coalescer.stop()
+            server.db_manager.coalescer = server.WriteCoalescer(server.db_manager.write_pool, max_batch, delay_ms / 1000)
+            elapsed, latencies, failed = await run_concurrently(args.bets, args.concurrency, lambda i: client.post(
+                "/api/bets", json=BENCH_BET, headers=headers[i % len(headers)]
+            ))
+            print(f"{label}: {args.bets} bets in {elapsed:.2f}s = {args.bets / elapsed:.0f}/s ({failed} failed)")
+            print(f"  latency: {summarize(latencies)}")
+            print(f"  batches: {server.db_manager.coalescer.stats()}")
+    await server.db_manager.stop()
+    server.db_manager.close()
+
+
+async def bench_storage(args):
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for profile in ("default", "tuned"):
+            # Each profile gets its own file, since WAL mode is persisted in the database header
+            server.DB_PATH = server.DB_PATH.with_name(f"storage-{profile}.db")
+            server.db_manager = server.DatabaseManager(profile=profile)
+            await server.init_db()
+            headers = await seed_bettors(f"bench-{profile}", args.users)
+
+            elapsed, latencies, failed = await run_concurrently(args.writes, args.concurrency, lambda i: client.post(
+                "/api/bets", json=BENCH_BET, headers=headers[i % len(headers)]
+            ))
+            print(f"{profile}: {args.writes} bet writes in {elapsed:.2f}s = {args.writes / elapsed:.0f}/s ({failed} failed)")
+            print(f"  latency: {summarize(latencies)}")
+
+            paths = ("/api/stats", "/api/bets?limit=50")
+            elapsed, latencies, failed = await run_concurrently(args.reads, args.concurrency, lambda i: client.get(
+                paths[i % len(paths)], headers=headers[i % len(headers)]
+            ))
+            print(f"{profile}: {args.reads} reads in {elapsed:.2f}s = {args.reads / elapsed:.0f}/s ({failed} failed)")
+            print(f"  latency: {summarize(latencies)}")
+
+            # The same hot queries without the HTTP stack, which otherwise dominates read latency
+            users = [f"bench-{profile}-{i}" for i in range(args.users)]
+            columns = list(server.BET_FIELDS)
+            elapsed, latencies, _ = await run_concurrently(args.reads, args.concurrency, lambda i: (
+                server.db_manager.fetch_one(server.USER_STATS_QUERY, (users[i % len(users)],)) if i % 2 else
+                server.fetch_bets_page(users[i % len(users)], None, columns, 50)
+            ))
+            print(f"{profile}: {args.reads} direct queries in {elapsed:.2f}s = {args.reads / elapsed:.0f}/s")
+            print(f"  latency: {summarize(latencies)}")
+            if profile == "tuned":
+                print(f"  checkpoint: {await server.db_manager.checkpoint()}")
+            await server.db_manager.stop()
+            server.db_manager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    login = commands.add_parser("login", help="login burst vs. latency of an unrelated endpoint")
+    login.add_argument("--users", type=int, default=32)
+    login.add_argument("--rounds", type=int, default=10)
+    login.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    login.set_defaults(run=bench_login)
+    bets = commands.add_parser("bets", help="throughput of concurrent bet placements with and without group commit")
+    bets.add_argument("--users", type=int, default=50)
+    bets.add_argument("--bets", type=int, default=2000)
+    bets.add_argument("--concurrency", type=int, default=200)
+    bets.add_argument("--delay-ms", type=float, default=server.DB_WRITE_BATCH_DELAY_MS)
+    bets.set_defaults(run=bench_bets)
+    storage = commands.add_parser("storage", help="local SQLite read/write throughput, default vs. tuned profile")
+    storage.add_argument("--users", type=int, default=50)
+    storage.add_argument("--writes", type=int, default=2000)
+    storage.add_argument("--reads", type=int, default=4000)
+    storage.add_argument("--concurrency", type=int, default=64)
+    storage.set_defaults(run=bench_storage)
+    args = parser.parse_args()
+    asyncio.run(args.run(args))
+
+
+if __name__ == "__main__":
+    main()
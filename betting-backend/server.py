@@ -2,19 +2,49 @@ from fastapi import FastAPI, APIRouter, HTTPException, Query, Depends, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
 import os
 import logging
 import json
 import hashlib
+import gzip
+import asyncio
+import time
+import random
+import importlib.util
+import bisect
+import contextvars
+import hmac
+import multiprocessing
+import base64
+import csv
+import io
+import warnings
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pathlib import Path
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import uuid
 from datetime import datetime, timezone, timedelta
 import httpx
+import numpy as np
 import aiosqlite
+import sqlite3
 import libsql_experimental as libsql
 from jose import JWTError, jwt
+import bcrypt
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 # ==================== CONFIGURATION ====================
 
@@ -22,14 +52,109 @@ ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # Database Config
-DB_PATH = ROOT_DIR / "dark_intel.db"
+DB_PATH = Path(os.environ.get("SQLITE_PATH", ROOT_DIR / "dark_intel.db"))
 TURSO_URL = os.environ.get("TURSO_DATABASE_URL")
 TURSO_TOKEN = os.environ.get("TURSO_AUTH_TOKEN")
 
+# Connection Pool Config
+DB_READ_POOL_SIZE = int(os.environ.get("DB_READ_POOL_SIZE", "4"))
+DB_WRITE_POOL_SIZE = int(os.environ.get("DB_WRITE_POOL_SIZE", "1"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+# Group commit: concurrent writes wait up to the delay and share one transaction
+DB_WRITE_BATCH_MAX = int(os.environ.get("DB_WRITE_BATCH_MAX", "64"))
+# Turso executes each statement as a network round trip and batching there is unmeasured, so it
+# defaults to one write per transaction
+DB_WRITE_BATCH_MAX_REMOTE = int(os.environ.get("DB_WRITE_BATCH_MAX_REMOTE", "1"))
+DB_WRITE_BATCH_DELAY_MS = float(os.environ.get("DB_WRITE_BATCH_DELAY_MS", "2"))
+DB_HEALTH_CHECK_INTERVAL = float(os.environ.get("DB_HEALTH_CHECK_INTERVAL", "30"))
+
+# Local SQLite Profile ("tuned" or "default"); only used when TURSO_URL is unset
+SQLITE_PROFILE = os.environ.get("SQLITE_PROFILE", "tuned")
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_BYTES = int(os.environ.get("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+SQLITE_CACHE_KIB = int(os.environ.get("SQLITE_CACHE_KIB", str(64 * 1024)))
+SQLITE_STATEMENT_CACHE = int(os.environ.get("SQLITE_STATEMENT_CACHE", "256"))
+SQLITE_CHECKPOINT_SECONDS = float(os.environ.get("SQLITE_CHECKPOINT_SECONDS", "60"))
+SQLITE_WAL_TRUNCATE_BYTES = int(os.environ.get("SQLITE_WAL_TRUNCATE_BYTES", str(64 * 1024 * 1024)))
+
+# Read Replica Config
+DB_REPLICA_PATH = os.environ.get("DB_REPLICA_PATH")
+DB_REPLICA_SYNC_INTERVAL = float(os.environ.get("DB_REPLICA_SYNC_INTERVAL", "1"))
+DB_REPLICA_MAX_STALENESS = float(os.environ.get("DB_REPLICA_MAX_STALENESS", "5"))
+
 # The Odds API Config
 ODDS_API_KEY = os.environ.get('ODDS_API_KEY', '')
 ODDS_API_BASE_URL = os.environ.get('ODDS_API_BASE_URL', 'https://api.the-odds-api.com/v4')
 
+# Odds API HTTP Client Config
+ODDS_API_CONNECT_TIMEOUT = float(os.environ.get("ODDS_API_CONNECT_TIMEOUT", "5"))
+ODDS_API_READ_TIMEOUT = float(os.environ.get("ODDS_API_READ_TIMEOUT", "30"))
+ODDS_API_MAX_CONNECTIONS = int(os.environ.get("ODDS_API_MAX_CONNECTIONS", "10"))
+ODDS_API_MAX_KEEPALIVE = int(os.environ.get("ODDS_API_MAX_KEEPALIVE", "5"))
+ODDS_API_MAX_RETRIES = int(os.environ.get("ODDS_API_MAX_RETRIES", "3"))
+ODDS_API_BACKOFF_BASE = float(os.environ.get("ODDS_API_BACKOFF_BASE", "0.5"))
+ODDS_API_BACKOFF_MAX = float(os.environ.get("ODDS_API_BACKOFF_MAX", "8"))
+ODDS_API_HTTP2 = os.environ.get("ODDS_API_HTTP2", "1") == "1"
+
+# Odds Cache Config
+ODDS_MEMORY_CACHE_MAX_ENTRIES = int(os.environ.get("ODDS_MEMORY_CACHE_MAX_ENTRIES", "256"))
+ODDS_MEMORY_CACHE_MAX_BYTES = int(os.environ.get("ODDS_MEMORY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+ODDS_MEMORY_CACHE_TTL_SECONDS = float(os.environ.get("ODDS_MEMORY_CACHE_TTL_SECONDS", "60"))
+ODDS_CACHE_STALE_SECONDS = float(os.environ.get("ODDS_CACHE_STALE_SECONDS", "3600"))
+# Budget for odds_cache_v2; the oldest refreshes are evicted past it
+ODDS_CACHE_MAX_ROWS = int(os.environ.get("ODDS_CACHE_MAX_ROWS", "500"))
+ODDS_CACHE_SWEEP_SECONDS = float(os.environ.get("ODDS_CACHE_SWEEP_SECONDS", "600"))
+# Free pages returned to the OS per sweep on local databases, so the write lock is held briefly
+ODDS_CACHE_VACUUM_PAGES = int(os.environ.get("ODDS_CACHE_VACUUM_PAGES", "1000"))
+ODDS_VERSION_HISTORY = int(os.environ.get("ODDS_VERSION_HISTORY", "120"))
+ODDS_GZIP_LEVEL = int(os.environ.get("ODDS_GZIP_LEVEL", "6"))
+ODDS_BROTLI_QUALITY = int(os.environ.get("ODDS_BROTLI_QUALITY", "5"))
+
+# Odds Poller Config
+ODDS_POLLER_ENABLED = os.environ.get("ODDS_POLLER_ENABLED", "1" if ODDS_API_KEY else "0") == "1"
+ODDS_POLL_MARKETS = "h2h,spreads,totals"
+ODDS_MARKETS = ("h2h", "spreads", "totals")
+ODDS_POLL_LIVE_SECONDS = float(os.environ.get("ODDS_POLL_LIVE_SECONDS", "60"))
+ODDS_POLL_SOON_SECONDS = float(os.environ.get("ODDS_POLL_SOON_SECONDS", "300"))
+ODDS_POLL_DAY_SECONDS = float(os.environ.get("ODDS_POLL_DAY_SECONDS", "1800"))
+ODDS_POLL_IDLE_SECONDS = float(os.environ.get("ODDS_POLL_IDLE_SECONDS", "10800"))
+ODDS_POLL_OFFSEASON_SECONDS = float(os.environ.get("ODDS_POLL_OFFSEASON_SECONDS", "21600"))
+ODDS_POLL_ERROR_SECONDS = float(os.environ.get("ODDS_POLL_ERROR_SECONDS", "300"))
+ODDS_POLL_GRACE_SECONDS = float(os.environ.get("ODDS_POLL_GRACE_SECONDS", "60"))
+ODDS_QUOTA_LOW = int(os.environ.get("ODDS_QUOTA_LOW", "500"))
+ODDS_QUOTA_CRITICAL = int(os.environ.get("ODDS_QUOTA_CRITICAL", "50"))
+
+# Odds Stream Config
+ODDS_STREAM_QUEUE_SIZE = int(os.environ.get("ODDS_STREAM_QUEUE_SIZE", "64"))
+ODDS_STREAM_HEARTBEAT_SECONDS = float(os.environ.get("ODDS_STREAM_HEARTBEAT_SECONDS", "15"))
+
+# Line History Config
+ODDS_HISTORY_RAW_HOURS = float(os.environ.get("ODDS_HISTORY_RAW_HOURS", "48"))
+ODDS_HISTORY_BUCKET_SECONDS = int(os.environ.get("ODDS_HISTORY_BUCKET_SECONDS", "3600"))
+ODDS_HISTORY_RETENTION_DAYS = float(os.environ.get("ODDS_HISTORY_RETENTION_DAYS", "365"))
+ODDS_HISTORY_COMPACT_SECONDS = float(os.environ.get("ODDS_HISTORY_COMPACT_SECONDS", "3600"))
+
+# Signal Scanner Config
+ODDS_SIGNAL_MIN_EV = float(os.environ.get("ODDS_SIGNAL_MIN_EV", "0.02"))
+ODDS_SIGNAL_MIN_BOOKS = int(os.environ.get("ODDS_SIGNAL_MIN_BOOKS", "3"))
+
+# Settlement Config
+SETTLEMENT_RESULTS_SOURCE = os.environ.get("SETTLEMENT_RESULTS_SOURCE", "odds_api" if ODDS_API_KEY else "file")
+SETTLEMENT_RESULTS_FILE = os.environ.get("SETTLEMENT_RESULTS_FILE", str(ROOT_DIR / "results.json"))
+SETTLEMENT_SCORES_DAYS = int(os.environ.get("SETTLEMENT_SCORES_DAYS", "3"))
+SETTLEMENT_BATCH_SIZE = int(os.environ.get("SETTLEMENT_BATCH_SIZE", "5000"))
+SETTLEMENT_INTERVAL_SECONDS = float(os.environ.get("SETTLEMENT_INTERVAL_SECONDS", "900"))
+
+# Principal Cache Config
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.environ.get("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.environ.get("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_WALLET_TTL_SECONDS = float(os.environ.get("PRINCIPAL_CACHE_WALLET_TTL_SECONDS", "5"))
+
+# Password Hashing Config
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get("PASSWORD_BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_CONCURRENCY = int(os.environ.get("PASSWORD_HASH_CONCURRENCY", str(max(1, PASSWORD_HASH_WORKERS) * 2)))
+
 # Security Config
 SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key-change-this-in-prod")
 ALGORITHM = "HS256"
@@ -40,7 +165,13 @@ SUPPORTED_SPORTS = {
     "basketball_nba": {"title": "NBA", "group": "Basketball"},
     "americanfootball_nfl": {"title": "NFL", "group": "American Football"},
     "icehockey_nhl": {"title": "NHL", "group": "Ice Hockey"},
-    "basketball_ncaab": {"title": "NCAAB", "group": "Basketball"}
+    "basketball_ncaab": {"title": "NCAAB", "group": "Basketball"},
+    "baseball_mlb": {"title": "MLB", "group": "Baseball"},
+    "americanfootball_ncaaf": {"title": "NCAAF", "group": "American Football"},
+    "soccer_epl": {"title": "EPL", "group": "Soccer"},
+    "soccer_germany_bundesliga": {"title": "Bundesliga", "group": "Soccer"},
+    "soccer_usa_mls": {"title": "MLS", "group": "Soccer"},
+    "soccer_uefa_champs_league": {"title": "UEFA Champions League", "group": "Soccer"}
 }
 
 # ==================== APP INITIALIZATION ====================
@@ -85,8 +216,10 @@ class BetCreate(BaseModel):
     bet_type: str
     odds: float
     amount: float
-    potential_payout: float
+    # Ignored: the payout is always derived from odds and amount on the server
+    potential_payout: Optional[float] = None
     commence_time: Optional[str] = None
+    point: Optional[float] = None
 
 class WalletUpdate(BaseModel):
     amount: float
@@ -94,56 +227,552 @@ class WalletUpdate(BaseModel):
 
 # ==================== DATABASE MANAGER ====================
 
-class DatabaseManager:
+class PooledConnection:
     def __init__(self):
+        self.conn = None
+        self.last_used = 0.0
+
+
+class ConnectionPool:
+    """Fixed-size pool of libsql connections driven through a shared thread executor.
+
+    Each connection is checked out by exactly one task at a time, so blocking
+    libsql calls never run concurrently on the same connection and never run
+    on the event loop.
+    """
+
+    def __init__(self, name: str, size: int, connect, executor: ThreadPoolExecutor):
+        self.name = name
+        self.size = max(1, size)
+        self._connect = connect
+        self._executor = executor
+        self._idle: Optional[asyncio.Queue] = None
+        self._slots: List[PooledConnection] = []
+        self.acquired = 0
+        self.timeouts = 0
+        self.reconnects = 0
+        self.errors = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _queue(self) -> asyncio.Queue:
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            self._slots = [PooledConnection() for _ in range(self.size)]
+            for slot in self._slots:
+                self._idle.put_nowait(slot)
+        return self._idle
+
+    async def _acquire(self) -> PooledConnection:
+        started = time.perf_counter()
+        try:
+            slot = await asyncio.wait_for(self._queue().get(), DB_POOL_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise RuntimeError(f"Timed out waiting for a {self.name} connection")
+        waited = time.perf_counter() - started
+        self.acquired += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        return slot
+
+    def _release(self, slot: PooledConnection):
+        self._queue().put_nowait(slot)
+
+    def _check(self, slot: PooledConnection):
+        if slot.conn is None:
+            slot.conn = self._connect()
+        elif time.monotonic() - slot.last_used > DB_HEALTH_CHECK_INTERVAL:
+            try:
+                slot.conn.execute("SELECT 1").fetchall()
+            except Exception as e:
+                logger.warning(f"{self.name} connection failed health check, reconnecting: {e}")
+                self._discard(slot)
+                slot.conn = self._connect()
+                self.reconnects += 1
+
+    def _discard(self, slot: PooledConnection):
+        if slot.conn is not None:
+            try:
+                slot.conn.close()
+            except Exception:
+                pass
+            slot.conn = None
+
+    def _call(self, slot: PooledConnection, fn):
+        self._check(slot)
+        try:
+            return fn(slot.conn)
+        except Exception:
+            self.errors += 1
+            try:
+                if slot.conn.in_transaction:
+                    slot.conn.rollback()
+            except Exception:
+                self._discard(slot)
+            raise
+        finally:
+            slot.last_used = time.monotonic()
+
+    async def run(self, fn):
+        slot = await self._acquire()
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self._call, slot, fn)
+        try:
+            result = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # The libsql call keeps running in its thread; only hand the
+            # connection back once it has actually finished.
+            future.add_done_callback(lambda _: self._release(slot))
+            raise
+        except BaseException:
+            self._release(slot)
+            raise
+        self._release(slot)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        idle = self._idle.qsize() if self._idle is not None else self.size
+        return {
+            "size": self.size,
+            "in_use": self.size - idle,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "reconnects": self.reconnects,
+            "errors": self.errors,
+            "wait_avg_ms": round(self.wait_total / self.acquired * 1000, 3) if self.acquired else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+    def close(self):
+        for slot in self._slots:
+            self._discard(slot)
+        self._idle = None
+        self._slots = []
+
+
+def _fetch_all(conn, query: str, params: tuple):
+    result = conn.execute(query, params)
+    rows = result.fetchall()
+    columns = [desc[0] for desc in result.description] if result.description else []
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def _run_write_batch(conn, fns: List[Any]) -> List[Tuple[bool, Any]]:
+    # Each write gets its own savepoint, so one failing caller only rolls back its own statements
+    if len(fns) == 1:
+        # A lone write needs no savepoint: just the statement and its commit
+        try:
+            result = fns[0](conn)
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            return [(False, e)]
+        conn.commit()
+        return [(True, result)]
+    outcomes = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for fn in fns:
+            conn.execute("SAVEPOINT coalesced_write")
+            try:
+                result = fn(conn)
+            except Exception as e:
+                conn.execute("ROLLBACK TO coalesced_write")
+                conn.execute("RELEASE coalesced_write")
+                outcomes.append((False, e))
+                continue
+            conn.execute("RELEASE coalesced_write")
+            outcomes.append((True, result))
+        conn.commit()
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    return outcomes
+
+
+class WriteCoalescer:
+    """Group commit for single-statement writes.
+
+    A write that finds nothing else queued runs at once. Otherwise the writes
+    already queued, plus any arriving within max_delay seconds (up to
+    max_batch), run in one transaction on the write pool, so they share
+    a single commit. Each caller gets back its own result or exception; if the
+    commit itself fails, every write in the batch fails with that error.
+    """
+
+    def __init__(self, pool: ConnectionPool, max_batch: int, max_delay: float):
+        self.pool = pool
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max(0.0, max_delay)
+        self._pending: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop = None
+        self.batches = 0
+        self.writes = 0
+        self.max_batch_seen = 0
+        self.commit_errors = 0
+
+    async def submit(self, fn):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._pending = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+        future = loop.create_future()
+        self._pending.put_nowait((fn, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        batch = [await self._pending.get()]
+        if self._pending.empty():
+            # No concurrent writers: waiting would only add latency
+            return batch
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            if not self._pending.empty():
+                batch.append(self._pending.get_nowait())
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._pending.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # Callers that were cancelled while waiting are dropped before the batch runs
+            batch = [(fn, future) for fn, future in batch if not future.done()]
+            if not batch:
+                continue
+            self.batches += 1
+            self.writes += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            try:
+                outcomes = await self.pool.run(lambda conn: _run_write_batch(conn, [fn for fn, _ in batch]))
+            except Exception as e:
+                self.commit_errors += 1
+                outcomes = [(False, e)] * len(batch)
+            for (_, future), (ok, value) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._pending is not None and not self._pending.empty():
+            _, future = self._pending.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Write coalescer stopped"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "writes": self.writes,
+            "avg_batch": round(self.writes / self.batches, 2) if self.batches else 0,
+            "max_batch": self.max_batch_seen,
+            "commit_errors": self.commit_errors,
+        }
+
+
+# The user a request acts for; set by get_current_user and used to route that user's reads
+current_principal: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_principal", default=None)
+
+class DatabaseManager:
+    """Write pool on the primary, reads on an optional local replica.
+
+    With a replica configured, reads go to it unless it has not synced
+    within DB_REPLICA_MAX_STALENESS, or the current principal wrote since
+    the start of the last completed sync (read-your-writes); those reads use
+    the primary read pool. Connections and the sync step are injectable, so
+    two local files can stand in for Turso and its embedded replica.
+    """
+
+    def __init__(self, connect=None, replica_connect=None, replica_sync=None, profile: Optional[str] = None):
         self.is_turso = bool(TURSO_URL and "turso.io" in TURSO_URL)
-        self._conn = None
+        self.profile = None if self.is_turso else (profile or SQLITE_PROFILE)
+        self.checkpoints = 0
+        self.truncations = 0
+        if replica_connect is None and self.is_turso and DB_REPLICA_PATH:
+            replica_connect = self._connect_replica
+            replica_sync = replica_sync or (lambda conn: conn.sync())
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, DB_READ_POOL_SIZE) * (2 if replica_connect else 1) + max(1, DB_WRITE_POOL_SIZE),
+            thread_name_prefix="db"
+        )
+        connect = connect or self._connect
+        self.read_pool = ConnectionPool("read", DB_READ_POOL_SIZE, connect, self._executor)
+        self.write_pool = ConnectionPool("write", DB_WRITE_POOL_SIZE, connect, self._executor)
+        self.replica_pool = (
+            ConnectionPool("replica", DB_READ_POOL_SIZE, replica_connect, self._executor) if replica_connect else None
+        )
+        self.coalescer = WriteCoalescer(
+            self.write_pool, DB_WRITE_BATCH_MAX_REMOTE if self.is_turso else DB_WRITE_BATCH_MAX,
+            DB_WRITE_BATCH_DELAY_MS / 1000
+        )
+        self._replica_sync = replica_sync
+        self._sync_task: Optional[asyncio.Task] = None
+        # Monotonic start time of the last completed sync: the replica holds every write before it
+        self.synced_through: Optional[float] = None
+        self._last_writes: Dict[str, float] = {}
+        self.syncs = 0
+        self.sync_errors = 0
+        self.routed = {"replica": 0, "primary_read_your_writes": 0, "primary_stale": 0}
         if self.is_turso:
             logger.info(f"Using Turso Database: {TURSO_URL}")
         else:
-            logger.info(f"Using Local SQLite: {DB_PATH}")
-
-    def _get_connection(self):
-        if self._conn is None:
-            if self.is_turso:
-                self._conn = libsql.connect(
-                    TURSO_URL,
-                    auth_token=TURSO_TOKEN
-                )
-            else:
-                self._conn = libsql.connect(str(DB_PATH))
-        return self._conn
+            logger.info(f"Using Local SQLite: {DB_PATH} ({self.profile} profile)")
+        if self.replica_pool is not None:
+            logger.info(f"Reading from replica: {DB_REPLICA_PATH or 'custom'}")
 
-    async def execute(self, query: str, params: tuple = ()):
+    def _connect(self):
+        if self.is_turso:
+            return libsql.connect(
+                TURSO_URL,
+                auth_token=TURSO_TOKEN
+            )
+        if self.profile == "tuned":
+            return self._connect_tuned()
+        conn = libsql.connect(str(DB_PATH))
+        # Only takes effect on a new file; lets sweep_odds_cache return free pages a few at a time
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL").fetchall()
+        # Separate read and write connections share the file, so wait on locks instead of failing
+        conn.execute("PRAGMA busy_timeout = 5000").fetchall()
+        return conn
+
+    def _connect_tuned(self):
+        # The stdlib driver keeps an LRU of prepared statements per connection, so the fixed
+        # hot queries are parsed and planned once per connection instead of on every call
+        conn = sqlite3.connect(
+            str(DB_PATH), timeout=5, check_same_thread=False, cached_statements=SQLITE_STATEMENT_CACHE
+        )
+        # Before journal_mode, which writes the header of a new file and fixes its auto_vacuum mode
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL").fetchall()
+        conn.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_BYTES}").fetchall()
+        conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_KIB}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        # Checkpoints are run by the maintenance job; the automatic one stays as a backstop
+        conn.execute("PRAGMA wal_autocheckpoint = 10000").fetchall()
+        conn.execute(f"PRAGMA journal_size_limit = {SQLITE_WAL_TRUNCATE_BYTES}").fetchall()
+        return conn
+
+    async def checkpoint(self) -> Dict[str, Any]:
+        wal_path = Path(f"{DB_PATH}-wal")
+        wal_bytes = wal_path.stat().st_size if wal_path.exists() else 0
+        # PASSIVE never waits on readers; once the WAL has grown past the limit, TRUNCATE resets it
+        mode = "TRUNCATE" if wal_bytes > SQLITE_WAL_TRUNCATE_BYTES else "PASSIVE"
+        busy, log_pages, checkpointed = await self.write_pool.run(
+            lambda conn: conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchall()[0]
+        )
+        self.checkpoints += 1
+        if mode == "TRUNCATE":
+            self.truncations += 1
+        return {"mode": mode, "wal_bytes": wal_bytes, "busy": busy, "log_pages": log_pages,
+                "checkpointed": checkpointed}
+
+    def _connect_replica(self):
+        return libsql.connect(DB_REPLICA_PATH, sync_url=TURSO_URL, auth_token=TURSO_TOKEN)
+
+    async def sync_replica(self):
+        started = time.monotonic()
+        try:
+            await self.replica_pool.run(self._replica_sync)
+        except Exception as e:
+            self.sync_errors += 1
+            logger.error(f"Replica sync error: {e}")
+            return
+        self.synced_through = started
+        self.syncs += 1
+        self._last_writes = {user: at for user, at in self._last_writes.items() if at >= started}
+
+    async def _sync_loop(self):
+        while True:
+            await self.sync_replica()
+            await asyncio.sleep(DB_REPLICA_SYNC_INTERVAL)
+
+    def start(self):
+        if self.replica_pool is not None and self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self):
+        await self.coalescer.stop()
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+
+    def _read_pool(self) -> ConnectionPool:
+        if self.replica_pool is None:
+            return self.read_pool
+        if self.synced_through is None or time.monotonic() - self.synced_through > DB_REPLICA_MAX_STALENESS:
+            self.routed["primary_stale"] += 1
+            return self.read_pool
+        principal = current_principal.get()
+        if principal is not None and self._last_writes.get(principal, -1.0) >= self.synced_through:
+            self.routed["primary_read_your_writes"] += 1
+            return self.read_pool
+        self.routed["replica"] += 1
+        return self.replica_pool
+
+    def _record_write(self):
+        principal = current_principal.get()
+        if principal is not None and self.replica_pool is not None:
+            self._last_writes[principal] = time.monotonic()
+
+    async def execute(self, query: str, params: tuple = (), primary: bool = False):
+        pool = self.read_pool if primary else self._read_pool()
         try:
-            conn = self._get_connection()
-            result = conn.execute(query, params)
-            rows = result.fetchall()
-            columns = [desc[0] for desc in result.description] if result.description else []
-            return [dict(zip(columns, row)) for row in rows]
+            return await pool.run(lambda conn: _fetch_all(conn, query, params))
         except Exception as e:
             logger.error(f"Execute error: {e}")
             raise
 
     async def execute_write(self, query: str, params: tuple = ()):
         try:
-            conn = self._get_connection()
-            conn.execute(query, params)
-            conn.commit()
+            await self.coalescer.submit(lambda conn: conn.execute(query, params))
         except Exception as e:
             logger.error(f"Write error: {e}")
             raise
+        finally:
+            self._record_write()
 
-    async def fetch_one(self, query: str, params: tuple = ()):
-        rows = await self.execute(query, params)
+    async def execute_transaction(self, fn):
+        def run(conn):
+            result = fn(conn)
+            conn.commit()
+            return result
+        try:
+            return await self.write_pool.run(run)
+        except Exception as e:
+            logger.error(f"Transaction error: {e}")
+            raise
+        finally:
+            self._record_write()
+
+    async def execute_returning(self, query: str, params: tuple = ()):
+        # Callers handle errors themselves; a RAISE(ABORT) from a trigger is an expected outcome
+        try:
+            return await self.coalescer.submit(lambda conn: _fetch_all(conn, query, params))
+        finally:
+            self._record_write()
+
+    async def fetch_one(self, query: str, params: tuple = (), primary: bool = False):
+        rows = await self.execute(query, params, primary)
         return rows[0] if rows else None
 
+    def stats(self) -> Dict[str, Any]:
+        stats = {"read": self.read_pool.stats(), "write": self.write_pool.stats(), "write_batches": self.coalescer.stats()}
+        if self.profile == "tuned":
+            stats["checkpoints"] = {"runs": self.checkpoints, "truncations": self.truncations}
+        if self.replica_pool is not None:
+            stats["replica"] = {
+                **self.replica_pool.stats(),
+                "syncs": self.syncs,
+                "sync_errors": self.sync_errors,
+                "lag_seconds": round(time.monotonic() - self.synced_through, 3) if self.synced_through else None,
+                "routed": dict(self.routed),
+            }
+        return stats
+
+    def close(self):
+        self.read_pool.close()
+        self.write_pool.close()
+        if self.replica_pool is not None:
+            self.replica_pool.close()
+
 db_manager = DatabaseManager()
 
 # ==================== DATABASE INITIALIZATION ====================
 
-async def init_db():
-    await db_manager.execute_write("""
+def _add_columns(conn, table: str, columns: Dict[str, str]):
+    # Databases created before a column joined the CREATE TABLE get it added in place
+    existing = {row["name"] for row in _fetch_all(conn, f"PRAGMA table_info({table})", ())}
+    for name, column_type in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
+def _rebuild_user_stats(conn) -> int:
+    conn.execute("DELETE FROM user_stats")
+    conn.execute("""
+        INSERT INTO user_stats (user_id, total_bets, pending_bets, won_bets, lost_bets, push_bets, void_bets,
+                                total_wagered, profit)
+        SELECT user_id, COUNT(*),
+            SUM(status = 'pending'), SUM(status = 'won'), SUM(status = 'lost'),
+            SUM(status = 'push'), SUM(status = 'void'),
+            COALESCE(SUM(amount), 0),
+            COALESCE(SUM(CASE status WHEN 'won' THEN potential_payout - amount WHEN 'lost' THEN -amount ELSE 0 END), 0)
+        FROM bets_v2
+        GROUP BY user_id
+    """)
+    return conn.execute("SELECT COUNT(*) FROM user_stats").fetchall()[0][0]
+
+async def rebuild_user_stats() -> int:
+    return await db_manager.execute_transaction(_rebuild_user_stats)
+
+USER_STATS_INSERT_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS bets_v2_stats_insert AFTER INSERT ON bets_v2
+    BEGIN
+        INSERT INTO user_stats (user_id, total_bets, pending_bets, won_bets, lost_bets, push_bets, void_bets,
+                                total_wagered, profit)
+        VALUES (NEW.user_id, 1, NEW.status = 'pending', NEW.status = 'won', NEW.status = 'lost',
+                NEW.status = 'push', NEW.status = 'void', COALESCE(NEW.amount, 0),
+                CASE NEW.status WHEN 'won' THEN COALESCE(NEW.potential_payout - NEW.amount, 0)
+                                WHEN 'lost' THEN COALESCE(-NEW.amount, 0) ELSE 0 END)
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_bets = total_bets + 1,
+            pending_bets = pending_bets + excluded.pending_bets,
+            won_bets = won_bets + excluded.won_bets,
+            lost_bets = lost_bets + excluded.lost_bets,
+            push_bets = push_bets + excluded.push_bets,
+            void_bets = void_bets + excluded.void_bets,
+            total_wagered = total_wagered + excluded.total_wagered,
+            profit = profit + excluded.profit;
+    END
+"""
+
+USER_STATS_STATUS_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS bets_v2_stats_status AFTER UPDATE OF status ON bets_v2
+    WHEN OLD.status IS NOT NEW.status
+    BEGIN
+        UPDATE user_stats SET
+            pending_bets = pending_bets + (NEW.status = 'pending') - (OLD.status = 'pending'),
+            won_bets = won_bets + (NEW.status = 'won') - (OLD.status = 'won'),
+            lost_bets = lost_bets + (NEW.status = 'lost') - (OLD.status = 'lost'),
+            push_bets = push_bets + (NEW.status = 'push') - (OLD.status = 'push'),
+            void_bets = void_bets + (NEW.status = 'void') - (OLD.status = 'void'),
+            profit = profit
+                + CASE NEW.status WHEN 'won' THEN COALESCE(NEW.potential_payout - NEW.amount, 0)
+                                  WHEN 'lost' THEN COALESCE(-NEW.amount, 0) ELSE 0 END
+                - CASE OLD.status WHEN 'won' THEN COALESCE(OLD.potential_payout - OLD.amount, 0)
+                                  WHEN 'lost' THEN COALESCE(-OLD.amount, 0) ELSE 0 END
+        WHERE user_id = NEW.user_id;
+    END
+"""
+
+# Append-only: each entry runs once, in order, and is recorded in schema_version.
+# Steps are SQL strings or callables taking the write connection. Every statement
+# is idempotent so databases that predate schema_version upgrade cleanly.
+MIGRATIONS: List[Tuple[int, str, List[Any]]] = [
+    (1, "baseline", [
+        """
         CREATE TABLE IF NOT EXISTS users_v2 (
             id TEXT PRIMARY KEY,
             username TEXT UNIQUE,
@@ -152,9 +781,8 @@ async def init_db():
             is_active INTEGER DEFAULT 1,
             created_at TEXT
         )
-    """)
-    
-    await db_manager.execute_write("""
+        """,
+        """
         CREATE TABLE IF NOT EXISTS wallet_v2 (
             id TEXT PRIMARY KEY,
             user_id TEXT UNIQUE,
@@ -164,9 +792,8 @@ async def init_db():
             total_lost REAL DEFAULT 0.0,
             updated_at TEXT
         )
-    """)
-    
-    await db_manager.execute_write("""
+        """,
+        """
         CREATE TABLE IF NOT EXISTS bets_v2 (
             id TEXT PRIMARY KEY,
             user_id TEXT,
@@ -184,26 +811,336 @@ async def init_db():
             created_at TEXT,
             commence_time TEXT
         )
-    """)
-    
-    await db_manager.execute_write("""
+        """,
+        """
         CREATE TABLE IF NOT EXISTS odds_cache_v2 (
             cache_key TEXT PRIMARY KEY,
             data TEXT,
             cached_at TEXT,
             expires_at TEXT
         )
+        """,
+    ]),
+    (2, "normalized_odds", [
+        """
+        CREATE TABLE IF NOT EXISTS odds_events (
+            event_id TEXT PRIMARY KEY,
+            sport_key TEXT NOT NULL,
+            sport_title TEXT,
+            commence_time TEXT,
+            home_team TEXT,
+            away_team TEXT,
+            updated_at TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_odds_events_sport ON odds_events (sport_key, commence_time)",
+        """
+        CREATE TABLE IF NOT EXISTS odds_bookmakers (
+            event_id TEXT NOT NULL,
+            bookmaker TEXT NOT NULL,
+            title TEXT,
+            last_update TEXT,
+            PRIMARY KEY (event_id, bookmaker)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_odds_bookmakers_bookmaker ON odds_bookmakers (bookmaker, event_id)",
+        """
+        CREATE TABLE IF NOT EXISTS odds_markets (
+            event_id TEXT NOT NULL,
+            bookmaker TEXT NOT NULL,
+            market TEXT NOT NULL,
+            last_update TEXT,
+            PRIMARY KEY (event_id, bookmaker, market)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS odds_outcomes (
+            event_id TEXT NOT NULL,
+            bookmaker TEXT NOT NULL,
+            market TEXT NOT NULL,
+            outcome TEXT NOT NULL,
+            price REAL,
+            point REAL,
+            updated_at TEXT,
+            PRIMARY KEY (event_id, bookmaker, market, outcome)
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (3, "line_history", [
+        """
+        CREATE TABLE IF NOT EXISTS odds_price_history (
+            event_id TEXT NOT NULL,
+            bookmaker TEXT NOT NULL,
+            market TEXT NOT NULL,
+            outcome TEXT NOT NULL,
+            ts INTEGER NOT NULL,
+            price REAL,
+            point REAL,
+            PRIMARY KEY (event_id, bookmaker, market, outcome, ts)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_odds_price_history_ts ON odds_price_history (ts)",
+        """
+        CREATE TABLE IF NOT EXISTS odds_price_rollups (
+            event_id TEXT NOT NULL,
+            bookmaker TEXT NOT NULL,
+            market TEXT NOT NULL,
+            outcome TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            point REAL,
+            PRIMARY KEY (event_id, bookmaker, market, outcome, bucket)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_odds_price_rollups_bucket ON odds_price_rollups (bucket)",
+    ]),
+    (4, "bet_settlement", [
+        lambda conn: _add_columns(conn, "bets_v2", {"point": "REAL", "settled_at": "TEXT"}),
+        "CREATE INDEX IF NOT EXISTS idx_bets_v2_pending ON bets_v2 (event_id) WHERE status = 'pending'",
+        """
+        CREATE TABLE IF NOT EXISTS event_results (
+            event_id TEXT PRIMARY KEY,
+            sport_key TEXT,
+            home_team TEXT,
+            away_team TEXT,
+            home_score REAL NOT NULL,
+            away_score REAL NOT NULL,
+            updated_at TEXT
+        )
+        """,
+    ]),
+    (5, "atomic_bet_placement", [
+        # Placing a bet is a single INSERT: the wallet is checked and debited in the same statement
+        """
+        CREATE TRIGGER IF NOT EXISTS bets_v2_debit_wallet BEFORE INSERT ON bets_v2
+        WHEN NEW.status = 'pending'
+        BEGIN
+            SELECT RAISE(ABORT, 'Insufficient balance')
+            WHERE NOT EXISTS (SELECT 1 FROM wallet_v2 WHERE user_id = NEW.user_id AND balance >= NEW.amount);
+            UPDATE wallet_v2 SET
+                balance = balance - NEW.amount,
+                total_wagered = COALESCE(total_wagered, 0) + NEW.amount,
+                updated_at = NEW.created_at
+            WHERE user_id = NEW.user_id;
+        END
+        """,
+    ]),
+    # id breaks created_at ties so keyset pages never skip or repeat a bet
+    (6, "query_indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_bets_v2_user_status_created_id ON bets_v2 (user_id, status, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_bets_v2_user_created_id ON bets_v2 (user_id, created_at, id)",
+    ]),
+    # Per-user counters kept by triggers in the same transaction that places or settles a bet
+    (7, "user_stats", [
+        """
+        CREATE TABLE IF NOT EXISTS user_stats (
+            user_id TEXT PRIMARY KEY,
+            total_bets INTEGER NOT NULL DEFAULT 0,
+            pending_bets INTEGER NOT NULL DEFAULT 0,
+            won_bets INTEGER NOT NULL DEFAULT 0,
+            lost_bets INTEGER NOT NULL DEFAULT 0,
+            push_bets INTEGER NOT NULL DEFAULT 0,
+            void_bets INTEGER NOT NULL DEFAULT 0,
+            total_wagered REAL NOT NULL DEFAULT 0,
+            profit REAL NOT NULL DEFAULT 0
+        )
+        """,
+        USER_STATS_INSERT_TRIGGER,
+        USER_STATS_STATUS_TRIGGER,
+        _rebuild_user_stats,
+    ]),
+]
+
+
+def _apply_migration(conn, version: int, name: str, steps: List[Any]) -> bool:
+    # Take the write lock up front so workers starting together apply each migration once
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    if conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchall():
+        return False
+    for step in steps:
+        if callable(step):
+            step(conn)
+        else:
+            conn.execute(step)
+    conn.execute(
+        "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+        (version, name, datetime.now(timezone.utc).isoformat())
+    )
+    return True
+
+async def init_db():
+    await db_manager.execute_write("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT,
+            applied_at TEXT
+        )
     """)
     
-    logger.info("Database initialized successfully (v2)")
+    row = await db_manager.fetch_one("SELECT MAX(version) AS version FROM schema_version")
+    current = int(row["version"] or 0) if row else 0
+    for version, name, steps in MIGRATIONS:
+        if version <= current:
+            continue
+        applied = await db_manager.execute_transaction(
+            lambda conn, version=version, name=name, steps=steps: _apply_migration(conn, version, name, steps)
+        )
+        if applied:
+            logger.info(f"Applied migration {version}: {name}")
+    
+    logger.info(f"Database initialized successfully (schema v{MIGRATIONS[-1][0]})")
+
+USER_STATS_QUERY = """
+    SELECT w.*, s.total_bets, s.pending_bets, s.won_bets, s.lost_bets, s.push_bets, s.void_bets,
+           s.total_wagered AS stats_wagered, s.profit
+    FROM wallet_v2 w LEFT JOIN user_stats s ON s.user_id = w.user_id
+    WHERE w.user_id = ?
+"""
+
+# Hot queries and the index each must use; `python server.py check-indexes` asserts the plans
+HOT_QUERIES: List[Tuple[str, str, tuple, str]] = [
+    ("bets by status",
+     "SELECT * FROM bets_v2 WHERE user_id = ? AND status = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+     ("u", "pending", 100), "idx_bets_v2_user_status_created_id"),
+    ("bets page",
+     "SELECT * FROM bets_v2 WHERE user_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?",
+     ("u", "2024-01-01", "x", 100), "idx_bets_v2_user_created_id"),
+    ("stats", USER_STATS_QUERY, ("u",), "sqlite_autoindex_user_stats"),
+    ("wallet", "SELECT * FROM wallet_v2 WHERE user_id = ?", ("u",), "sqlite_autoindex_wallet_v2"),
+    ("user", "SELECT * FROM users_v2 WHERE username = ?", ("u",), "sqlite_autoindex_users_v2"),
+    ("settlement",
+     "SELECT b.id FROM bets_v2 b JOIN event_results r ON r.event_id = b.event_id WHERE b.status = 'pending' LIMIT 1",
+     (), "idx_bets_v2_pending"),
+    ("odds events",
+     "SELECT * FROM odds_events WHERE sport_key = ? ORDER BY commence_time",
+     ("basketball_nba",), "idx_odds_events_sport"),
+]
+
+def _explain_hot_queries(conn) -> List[List[str]]:
+    # EXPLAIN never checks the schema cookie, so make the connection load the current schema first
+    conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchall()
+    return [
+        [row["detail"] for row in _fetch_all(conn, f"EXPLAIN QUERY PLAN {query}", params)]
+        for _, query, params, _ in HOT_QUERIES
+    ]
+
+async def check_indexes() -> List[str]:
+    failures = []
+    plans = await db_manager.read_pool.run(_explain_hot_queries)
+    for (name, _, _, index), details in zip(HOT_QUERIES, plans):
+        # A temp b-tree means the rows are sorted after the fact instead of read in index order
+        if not any(f"INDEX {index}" in detail for detail in details) or any("TEMP B-TREE" in detail for detail in details):
+            failures.append(f"{name}: expected {index}, plan was {details}")
+    return failures
 
 # ==================== AUTH UTILITIES ====================
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return get_password_hash(plain_password) == hashed_password
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+def _is_legacy_hash(hashed_password: str) -> bool:
+    return len(hashed_password) == 64 and all(c in "0123456789abcdef" for c in hashed_password)
+
+def _bcrypt_rounds(hashed_password: str) -> int:
+    try:
+        return int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+class PasswordHasher:
+    """bcrypt hashing and verification off the event loop.
+
+    The KDF runs in a process pool (a spawn context, so workers only import
+    bcrypt) and a semaphore caps how many calls are queued on it; time spent
+    waiting on that cap is reported as queue time. Legacy unsalted SHA-256
+    hashes still verify and are flagged for rehash. With workers set to 0
+    the KDF runs inline, which is only useful for comparison benchmarks.
+    """
+
+    def __init__(self, rounds: int, workers: int, concurrency: int):
+        self.rounds = rounds
+        self.workers = workers
+        self.concurrency = concurrency
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.calls = 0
+        self.rehashes = 0
+        self.queue_seconds = 0.0
+        self.max_queue_seconds = 0.0
+        self.kdf_seconds = 0.0
+
+    def start(self):
+        if self.workers > 0 and self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn, *args):
+        if self._semaphore is None:
+            self.start()
+        queued = time.perf_counter()
+        async with self._semaphore:
+            started = time.perf_counter()
+            waited = started - queued
+            self.queue_seconds += waited
+            self.max_queue_seconds = max(self.max_queue_seconds, waited)
+            try:
+                if self._executor is None:
+                    return fn(*args)
+                return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+            finally:
+                self.calls += 1
+                self.kdf_seconds += time.perf_counter() - started
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(bcrypt.hashpw, password.encode(), bcrypt.gensalt(self.rounds))
+        return hashed.decode()
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, bool]:
+        """Whether the password matches, and whether the stored hash should be upgraded."""
+        if not hashed_password:
+            return False, False
+        if _is_legacy_hash(hashed_password):
+            digest = hashlib.sha256(password.encode()).hexdigest()
+            return hmac.compare_digest(digest, hashed_password), True
+        try:
+            valid = await self._run(bcrypt.checkpw, password.encode(), hashed_password.encode())
+        except ValueError:
+            return False, False
+        return valid, valid and _bcrypt_rounds(hashed_password) < self.rounds
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "rehashes": self.rehashes,
+            "avg_queue_ms": round(self.queue_seconds / self.calls * 1000, 2) if self.calls else 0.0,
+            "max_queue_ms": round(self.max_queue_seconds * 1000, 2),
+            "avg_kdf_ms": round(self.kdf_seconds / self.calls * 1000, 2) if self.calls else 0.0,
+            "workers": self.workers,
+        }
+
+password_hasher = PasswordHasher(PASSWORD_BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_CONCURRENCY)
 
-def get_password_hash(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
+async def rehash_password(user: Dict, password: str):
+    if len(password.encode()) > BCRYPT_MAX_PASSWORD_BYTES:
+        return
+    hashed_password = await password_hasher.hash(password)
+    # Compare-and-set so a concurrent password change is never overwritten
+    await db_manager.execute_write(
+        "UPDATE users_v2 SET hashed_password = ? WHERE id = ? AND hashed_password = ?",
+        (hashed_password, user["id"], user["hashed_password"])
+    )
+    principal_cache.invalidate_user(user["id"])
+    password_hasher.rehashes += 1
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -215,7 +1152,97 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+class PrincipalCache:
+    """Verified bearer tokens mapped to their users_v2 row, plus recent wallet rows.
+
+    A token is only cached after its signature checks out and is served until
+    the cache TTL or the token's own exp, whichever is first, so repeat
+    requests skip both the JWT decode and the user lookup. Wallet rows live
+    for a shorter TTL since other workers also move balances. Writes in this
+    process invalidate their user or wallet directly.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, wallet_ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.wallet_ttl = wallet_ttl
+        self._entries: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()
+        self._tokens_by_user: Dict[str, set] = {}
+        self._wallets: Dict[str, Tuple[Dict, float]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, token: str) -> Optional[Dict]:
+        entry = self._entries.get(token)
+        if entry is None or entry[1] <= time.time():
+            if entry is not None:
+                self._remove(token)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, token: str, user: Dict, token_exp: Optional[float]):
+        expires = time.time() + self.ttl
+        if token_exp is not None:
+            expires = min(expires, token_exp)
+        if token in self._entries:
+            self._remove(token)
+        self._entries[token] = (user, expires)
+        self._tokens_by_user.setdefault(user["id"], set()).add(token)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, token: str):
+        user, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(user["id"])
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user["id"]]
+                self._wallets.pop(user["id"], None)
+
+    def get_wallet(self, user_id: str) -> Optional[Dict]:
+        entry = self._wallets.get(user_id)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    def set_wallet(self, user_id: str, wallet: Dict):
+        # Only principals we hold get a wallet entry, which keeps it bounded by max_entries
+        if user_id in self._tokens_by_user:
+            self._wallets[user_id] = (wallet, time.monotonic() + self.wallet_ttl)
+
+    def invalidate_user(self, user_id: str):
+        for token in list(self._tokens_by_user.get(user_id, ())):
+            self._remove(token)
+
+    def invalidate_wallet(self, user_id: str):
+        self._wallets.pop(user_id, None)
+
+    def invalidate_wallets(self):
+        self._wallets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "wallets": len(self._wallets),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_MAX_ENTRIES, PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_WALLET_TTL_SECONDS)
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
+    user = principal_cache.get(token)
+    if user is not None:
+        current_principal.set(user["id"])
+        return user
+    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -229,32 +1256,1713 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-        
+    
+    # Route the lookup itself by the token's user, so a fresh registration reads from the primary
+    current_principal.set(payload.get("user_id"))
     user = await db_manager.fetch_one("SELECT * FROM users_v2 WHERE username = ?", (token_data.username,))
     if user is None:
         raise credentials_exception
+    current_principal.set(user["id"])
+    principal_cache.set(token, user, payload.get("exp"))
     return user
 
+async def get_admin_user(current_user: dict = Depends(get_current_user)):
+    ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME", "adminash")
+    
+    if current_user["username"] not in [ADMIN_USERNAME, "ashadmin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, 
+            detail="Admin privileges required"
+        )
+    return current_user
+
 # ==================== ODDS API CLIENT ====================
 
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+odds_http_client: Optional[httpx.AsyncClient] = None
+odds_api_quota: Dict[str, Any] = {"remaining": None, "used": None, "updated_at": None}
+
+def create_odds_http_client() -> httpx.AsyncClient:
+    http2 = ODDS_API_HTTP2 and importlib.util.find_spec("h2") is not None
+    if ODDS_API_HTTP2 and not http2:
+        logger.warning("h2 is not installed, Odds API client falling back to HTTP/1.1")
+    return httpx.AsyncClient(
+        http2=http2,
+        timeout=httpx.Timeout(ODDS_API_READ_TIMEOUT, connect=ODDS_API_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=ODDS_API_MAX_CONNECTIONS,
+            max_keepalive_connections=ODDS_API_MAX_KEEPALIVE,
+            keepalive_expiry=60.0
+        )
+    )
+
+def _record_quota(headers: httpx.Headers):
+    remaining = headers.get("x-requests-remaining")
+    used = headers.get("x-requests-used")
+    if remaining is None and used is None:
+        return
+    try:
+        odds_api_quota["remaining"] = int(float(remaining)) if remaining is not None else None
+        odds_api_quota["used"] = int(float(used)) if used is not None else None
+        odds_api_quota["updated_at"] = datetime.now(timezone.utc).isoformat()
+    except ValueError:
+        logger.warning(f"Unexpected Odds API quota headers: {remaining!r} / {used!r}")
+
+def get_odds_http_client() -> httpx.AsyncClient:
+    global odds_http_client
+    if odds_http_client is None or odds_http_client.is_closed:
+        odds_http_client = create_odds_http_client()
+    return odds_http_client
+
+def _retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    if retry_after:
+        try:
+            return min(float(retry_after), ODDS_API_BACKOFF_MAX)
+        except ValueError:
+            pass
+    # Full jitter keeps parallel sport refreshes from retrying in lockstep
+    return random.uniform(0, min(ODDS_API_BACKOFF_MAX, ODDS_API_BACKOFF_BASE * (2 ** attempt)))
+
+class OddsFetchError(Exception):
+    """The Odds API could not be reached or refused the request; distinct from an empty feed."""
+
+async def _odds_api_get(path: str, params: Dict[str, Any], sport_key: str) -> Optional[Any]:
+    client = get_odds_http_client()
+    for attempt in range(ODDS_API_MAX_RETRIES + 1):
+        try:
+            async with client.stream("GET", f"{ODDS_API_BASE_URL}{path}", params={"apiKey": ODDS_API_KEY, **params}) as response:
+                _record_quota(response.headers)
+                if response.status_code == 200:
+                    body = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        body.extend(chunk)
+                    return json.loads(body)
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt == ODDS_API_MAX_RETRIES:
+                    logger.error(f"Odds API error: {response.status_code}")
+                    return None
+                delay = _retry_delay(attempt, response.headers.get("retry-after"))
+                logger.warning(f"Odds API {response.status_code} for {sport_key}, retrying in {delay:.2f}s")
+        except httpx.TransportError as e:
+            if attempt == ODDS_API_MAX_RETRIES:
+                logger.error(f"Odds API fetch error: {e}")
+                return None
+            delay = _retry_delay(attempt)
+            logger.warning(f"Odds API transport error for {sport_key}, retrying in {delay:.2f}s: {e}")
+        except Exception as e:
+            logger.error(f"Odds API fetch error: {e}")
+            return None
+        await asyncio.sleep(delay)
+    return None
+
 async def fetch_odds_from_api(sport_key: str, markets: str) -> List[Dict]:
+    if not ODDS_API_KEY:
+        # No provider configured: the feed is genuinely empty
+        return []
     params = {
-        "apiKey": ODDS_API_KEY,
         "regions": "us",
         "markets": markets,
         "oddsFormat": "american"
     }
+    odds_data = await _odds_api_get(f"/sports/{sport_key}/odds", params, sport_key)
+    if odds_data is None:
+        # Never stored as an empty feed, which would wipe the lines and back polling off for hours
+        raise OddsFetchError(f"Odds API fetch failed for {sport_key}")
+    return odds_data
+
+async def fetch_scores_from_api(sport_key: str, days_from: int = 3) -> List[Dict]:
+    return await _odds_api_get(f"/sports/{sport_key}/scores", {"daysFrom": days_from}, sport_key) or []
+
+# ==================== ODDS STORE ====================
+
+def _placeholders(values) -> str:
+    return ", ".join("?" for _ in values)
+
+def _ingest_odds(conn, sport_key: str, markets: List[str], odds_data: List[Dict], fetched_at: datetime) -> Dict[str, Any]:
+    """Upsert one Odds API response into the normalized tables, writing only changed rows.
+
+    Runs on the write connection inside the caller's transaction, appends each
+    price change to odds_price_history and returns the changes it applied.
+    """
+    now = fetched_at.isoformat()
+    ts = int(fetched_at.timestamp())
+    market_marks = _placeholders(markets)
+    existing_events = {
+        row[0]: tuple(row[1:])
+        for row in conn.execute(
+            "SELECT event_id, sport_title, commence_time, home_team, away_team FROM odds_events WHERE sport_key = ?",
+            (sport_key,)
+        ).fetchall()
+    }
+    existing_prices = {
+        tuple(row[:4]): (row[4], row[5])
+        for row in conn.execute(f"""
+            SELECT o.event_id, o.bookmaker, o.market, o.outcome, o.price, o.point
+            FROM odds_outcomes o JOIN odds_events e ON e.event_id = o.event_id
+            WHERE e.sport_key = ? AND o.market IN ({market_marks})
+        """, (sport_key, *markets)).fetchall()
+    }
+    existing_markets = {key[:3] for key in existing_prices}
+
+    event_rows, bookmaker_rows, market_rows, outcome_rows = [], [], [], []
+    seen = set()
+    changed = []
+    for event in odds_data:
+        event_id = event["id"]
+        fields = (event.get("sport_title"), event.get("commence_time"), event.get("home_team"), event.get("away_team"))
+        if existing_events.get(event_id) != fields:
+            event_rows.append((event_id, sport_key, *fields, now))
+        for bookmaker in event.get("bookmakers", []):
+            book_changed = False
+            for market in bookmaker.get("markets", []):
+                market_key = (event_id, bookmaker["key"], market["key"])
+                market_changed = market_key not in existing_markets
+                for outcome in market.get("outcomes", []):
+                    key = market_key + (outcome["name"],)
+                    value = (outcome.get("price"), outcome.get("point"))
+                    seen.add(key)
+                    if existing_prices.get(key) != value:
+                        outcome_rows.append(key + value + (now,))
+                        changed.append(key + value)
+                        market_changed = True
+                if market_changed:
+                    market_rows.append(market_key + (market.get("last_update"),))
+                    book_changed = True
+            if book_changed:
+                bookmaker_rows.append((event_id, bookmaker["key"], bookmaker.get("title"), bookmaker.get("last_update")))
+
+    removed = [key for key in existing_prices if key not in seen]
+    removed_markets = existing_markets - {key[:3] for key in seen}
+    fed_ids = {event["id"] for event in odds_data}
+    removed_events = [event_id for event_id in existing_events if event_id not in fed_ids]
+
+    if event_rows:
+        conn.executemany("""
+            INSERT INTO odds_events (event_id, sport_key, sport_title, commence_time, home_team, away_team, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (event_id) DO UPDATE SET
+                sport_title = excluded.sport_title, commence_time = excluded.commence_time,
+                home_team = excluded.home_team, away_team = excluded.away_team, updated_at = excluded.updated_at
+        """, event_rows)
+    if bookmaker_rows:
+        conn.executemany("""
+            INSERT INTO odds_bookmakers (event_id, bookmaker, title, last_update) VALUES (?, ?, ?, ?)
+            ON CONFLICT (event_id, bookmaker) DO UPDATE SET title = excluded.title, last_update = excluded.last_update
+        """, bookmaker_rows)
+    if market_rows:
+        conn.executemany("""
+            INSERT INTO odds_markets (event_id, bookmaker, market, last_update) VALUES (?, ?, ?, ?)
+            ON CONFLICT (event_id, bookmaker, market) DO UPDATE SET last_update = excluded.last_update
+        """, market_rows)
+    if outcome_rows:
+        conn.executemany("""
+            INSERT INTO odds_outcomes (event_id, bookmaker, market, outcome, price, point, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (event_id, bookmaker, market, outcome) DO UPDATE SET
+                price = excluded.price, point = excluded.point, updated_at = excluded.updated_at
+        """, outcome_rows)
+    if removed:
+        conn.executemany(
+            "DELETE FROM odds_outcomes WHERE event_id = ? AND bookmaker = ? AND market = ? AND outcome = ?",
+            removed
+        )
+    if removed_markets:
+        conn.executemany(
+            "DELETE FROM odds_markets WHERE event_id = ? AND bookmaker = ? AND market = ?",
+            list(removed_markets)
+        )
+        conn.executemany("""
+            DELETE FROM odds_bookmakers WHERE event_id = ? AND bookmaker = ?
+            AND NOT EXISTS (SELECT 1 FROM odds_markets m WHERE m.event_id = ? AND m.bookmaker = ?)
+        """, [(event_id, bookmaker, event_id, bookmaker) for event_id, bookmaker in {key[:2] for key in removed_markets}])
+    if changed or removed:
+        # Only deltas are recorded; a NULL price marks a line that was taken down
+        conn.executemany("""
+            INSERT OR REPLACE INTO odds_price_history (event_id, bookmaker, market, outcome, ts, price, point)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [key[:4] + (ts,) + key[4:] for key in changed] + [key + (ts, None, None) for key in removed])
+    if removed_events:
+        for table in ("odds_outcomes", "odds_markets", "odds_bookmakers", "odds_events"):
+            conn.executemany(f"DELETE FROM {table} WHERE event_id = ?", [(event_id,) for event_id in removed_events])
+
+    return {
+        "changed": changed,
+        "removed": removed,
+        "removed_events": removed_events,
+        "events": {key[0] for key in changed} | {key[0] for key in removed} | {row[0] for row in event_rows},
+    }
+
+def _assemble_events(event_rows: List[Dict], outcome_rows: List[Dict]) -> List[Dict]:
+    events = {}
+    for row in event_rows:
+        events[row["event_id"]] = {
+            "id": row["event_id"],
+            "sport_key": row["sport_key"],
+            "sport_title": row["sport_title"],
+            "commence_time": row["commence_time"],
+            "home_team": row["home_team"],
+            "away_team": row["away_team"],
+            "bookmakers": [],
+        }
+    bookmakers = {}
+    markets = {}
+    for row in outcome_rows:
+        event = events.get(row["event_id"])
+        if event is None:
+            continue
+        book_key = (row["event_id"], row["bookmaker"])
+        bookmaker = bookmakers.get(book_key)
+        if bookmaker is None:
+            bookmaker = {"key": row["bookmaker"], "title": row["title"], "last_update": row["book_update"], "markets": []}
+            bookmakers[book_key] = bookmaker
+            event["bookmakers"].append(bookmaker)
+        market_key = book_key + (row["market"],)
+        market = markets.get(market_key)
+        if market is None:
+            market = {"key": row["market"], "last_update": row["market_update"], "outcomes": []}
+            markets[market_key] = market
+            bookmaker["markets"].append(market)
+        outcome = {"name": row["outcome"], "price": row["price"]}
+        if row["point"] is not None:
+            outcome["point"] = row["point"]
+        market["outcomes"].append(outcome)
+    return list(events.values())
+
+ODDS_OUTCOME_COLUMNS = """
+    o.event_id, o.bookmaker, b.title, b.last_update AS book_update,
+    o.market, m.last_update AS market_update, o.outcome, o.price, o.point
+"""
+ODDS_OUTCOME_JOINS = """
+    JOIN odds_markets m ON m.event_id = o.event_id AND m.bookmaker = o.bookmaker AND m.market = o.market
+    JOIN odds_bookmakers b ON b.event_id = o.event_id AND b.bookmaker = o.bookmaker
+"""
+
+ODDS_SPORT_EVENTS_QUERY = "SELECT * FROM odds_events WHERE sport_key = ? ORDER BY commence_time, event_id"
+
+def _sport_outcomes_query(markets: List[str]) -> str:
+    return f"""
+        SELECT {ODDS_OUTCOME_COLUMNS}
+        FROM odds_events e JOIN odds_outcomes o ON o.event_id = e.event_id {ODDS_OUTCOME_JOINS}
+        WHERE e.sport_key = ? AND o.market IN ({_placeholders(markets)})
+        ORDER BY o.event_id, o.bookmaker, o.market
+    """
+
+def _read_odds(conn, sport_key: str, markets: List[str]) -> List[Dict]:
+    # load_odds on a given connection, for callers already inside a transaction
+    return _assemble_events(
+        _fetch_all(conn, ODDS_SPORT_EVENTS_QUERY, (sport_key,)),
+        _fetch_all(conn, _sport_outcomes_query(markets), (sport_key, *markets)),
+    )
+
+async def load_odds(sport_key: str, markets: List[str]) -> List[Dict]:
+    event_rows = await db_manager.execute(ODDS_SPORT_EVENTS_QUERY, (sport_key,))
+    outcome_rows = await db_manager.execute(_sport_outcomes_query(markets), (sport_key, *markets))
+    return _assemble_events(event_rows, outcome_rows)
+
+async def load_event_odds(event_id: str, markets: List[str]) -> Optional[Dict]:
+    event_rows = await db_manager.execute("SELECT * FROM odds_events WHERE event_id = ?", (event_id,))
+    if not event_rows:
+        return None
+    outcome_rows = await db_manager.execute(f"""
+        SELECT {ODDS_OUTCOME_COLUMNS}
+        FROM odds_outcomes o {ODDS_OUTCOME_JOINS}
+        WHERE o.event_id = ? AND o.market IN ({_placeholders(markets)})
+        ORDER BY o.bookmaker, o.market
+    """, (event_id, *markets))
+    return _assemble_events(event_rows, outcome_rows)[0]
+
+async def load_bookmaker_odds(sport_key: str, bookmaker: str, markets: List[str]) -> List[Dict]:
+    outcome_rows = await db_manager.execute(f"""
+        SELECT {ODDS_OUTCOME_COLUMNS}
+        FROM odds_bookmakers b JOIN odds_events e ON e.event_id = b.event_id
+        JOIN odds_markets m ON m.event_id = b.event_id AND m.bookmaker = b.bookmaker
+        JOIN odds_outcomes o ON o.event_id = m.event_id AND o.bookmaker = m.bookmaker AND o.market = m.market
+        WHERE b.bookmaker = ? AND e.sport_key = ? AND o.market IN ({_placeholders(markets)})
+        ORDER BY o.event_id, o.market
+    """, (bookmaker, sport_key, *markets))
+    event_ids = sorted({row["event_id"] for row in outcome_rows})
+    if not event_ids:
+        return []
+    event_rows = await db_manager.execute(
+        f"SELECT * FROM odds_events WHERE event_id IN ({_placeholders(event_ids)}) ORDER BY commence_time, event_id",
+        tuple(event_ids)
+    )
+    return _assemble_events(event_rows, outcome_rows)
+
+def _compact_history(conn, cutoff: int, retention_cutoff: int) -> int:
+    conn.execute("""
+        INSERT OR REPLACE INTO odds_price_rollups
+            (event_id, bookmaker, market, outcome, bucket, open, high, low, close, point)
+        SELECT event_id, bookmaker, market, outcome, bucket,
+               MAX(CASE WHEN first_rank = 1 THEN price END), MAX(price), MIN(price),
+               MAX(CASE WHEN last_rank = 1 THEN price END), MAX(CASE WHEN last_rank = 1 THEN point END)
+        FROM (
+            SELECT event_id, bookmaker, market, outcome, price, point, (ts / ?) * ? AS bucket,
+                   ROW_NUMBER() OVER (PARTITION BY event_id, bookmaker, market, outcome, ts / ? ORDER BY ts) AS first_rank,
+                   ROW_NUMBER() OVER (PARTITION BY event_id, bookmaker, market, outcome, ts / ? ORDER BY ts DESC) AS last_rank
+            FROM odds_price_history
+            WHERE ts < ? AND price IS NOT NULL
+        )
+        GROUP BY event_id, bookmaker, market, outcome, bucket
+    """, (ODDS_HISTORY_BUCKET_SECONDS, ODDS_HISTORY_BUCKET_SECONDS, ODDS_HISTORY_BUCKET_SECONDS,
+          ODDS_HISTORY_BUCKET_SECONDS, cutoff))
+    compacted = conn.execute("DELETE FROM odds_price_history WHERE ts < ?", (cutoff,)).rowcount
+    conn.execute("DELETE FROM odds_price_rollups WHERE bucket < ?", (retention_cutoff,))
+    return compacted
+
+async def compact_odds_history() -> int:
+    now = time.time()
+    # Align to a bucket boundary so every rolled-up bucket is complete
+    cutoff = int(now - ODDS_HISTORY_RAW_HOURS * 3600) // ODDS_HISTORY_BUCKET_SECONDS * ODDS_HISTORY_BUCKET_SECONDS
+    retention_cutoff = int(now - ODDS_HISTORY_RETENTION_DAYS * 86400)
+    compacted = await db_manager.execute_transaction(lambda conn: _compact_history(conn, cutoff, retention_cutoff))
+    if compacted:
+        logger.info(f"Compacted {compacted} line history rows into {ODDS_HISTORY_BUCKET_SECONDS}s buckets")
+    return compacted
+
+async def load_event_history(event_id: str, bookmaker: Optional[str], market: Optional[str],
+                             start: Optional[int], end: Optional[int]) -> List[Dict]:
+    filters = "event_id = ?"
+    params: List[Any] = [event_id]
+    if bookmaker:
+        filters += " AND bookmaker = ?"
+        params.append(bookmaker)
+    if market:
+        filters += " AND market = ?"
+        params.append(market)
+    rollup_filters, raw_filters = filters, filters
+    if start is not None:
+        rollup_filters += " AND bucket >= ?"
+        raw_filters += " AND ts >= ?"
+        params.append(start)
+    if end is not None:
+        rollup_filters += " AND bucket <= ?"
+        raw_filters += " AND ts <= ?"
+        params.append(end)
+    rollups = await db_manager.execute(f"""
+        SELECT bookmaker, market, outcome, bucket AS t, open, high, low, close AS price, point
+        FROM odds_price_rollups WHERE {rollup_filters}
+        ORDER BY bookmaker, market, outcome, bucket
+    """, tuple(params))
+    raw = await db_manager.execute(f"""
+        SELECT bookmaker, market, outcome, ts AS t, price, point
+        FROM odds_price_history WHERE {raw_filters}
+        ORDER BY bookmaker, market, outcome, ts
+    """, tuple(params))
+
+    series: Dict[Tuple[str, str, str], List[Dict]] = {}
+    for row in rollups + raw:
+        key = (row.pop("bookmaker"), row.pop("market"), row.pop("outcome"))
+        series.setdefault(key, []).append(row)
+    return [
+        {"bookmaker": key[0], "market": key[1], "outcome": key[2], "points": points}
+        for key, points in sorted(series.items())
+    ]
+
+# ==================== ODDS CACHE ====================
+
+class OddsMemoryCache:
+    """Process-local LRU tier holding parsed odds payloads in front of odds_cache_v2.
+
+    Entries are fresh for at most ODDS_MEMORY_CACHE_TTL_SECONDS (so other workers'
+    refreshes are picked up from the database tier) and may be served stale for
+    ODDS_CACHE_STALE_SECONDS past the database expiry while a refresh runs.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Tuple[Optional[Any], bool]:
+        entry = self._entries.get(key)
+        now = time.time()
+        if entry is None or now >= entry["stale_until"]:
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None, False
+        self._entries.move_to_end(key)
+        if now >= entry["fresh_until"]:
+            self.stale_hits += 1
+            return entry["value"], True
+        self.hits += 1
+        return entry["value"], False
+
+    def peek(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        return entry["value"] if entry is not None else None
+
+    def set(self, key: str, value: Any, expires_at: datetime, size: int):
+        now = time.time()
+        expires = expires_at.timestamp()
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = {
+            "value": value,
+            "size": size,
+            "fresh_until": min(expires, now + ODDS_MEMORY_CACHE_TTL_SECONDS),
+            "stale_until": max(expires, now) + ODDS_CACHE_STALE_SECONDS,
+        }
+        self.total_bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self.total_bytes -= entry["size"]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key onto one in-flight task.
+
+    The shared task is shielded, so a cancelled caller never cancels the work
+    other callers are waiting on; errors propagate to every waiter.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Any, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def do(self, key: Any, fn):
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: Any, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+        }
+
+def dumps_bytes(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode()
+
+def compress_variants(body: bytes) -> Dict[str, bytes]:
+    variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=ODDS_GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=ODDS_BROTLI_QUALITY)
+    return variants
+
+def _pick_encoding(accept_encoding: Optional[str], variants: Dict[str, bytes]) -> str:
+    if not accept_encoding:
+        return "identity"
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding in variants and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+def encoded_response(variants: Dict[str, bytes], etag: str, accept_encoding: Optional[str]) -> Response:
+    encoding = _pick_encoding(accept_encoding, variants)
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=variants[encoding], media_type="application/json", headers=headers)
+
+class OddsSnapshot:
+    """One refresh of one cache key, with its response body rendered once.
+
+    The body is the exact bytes /api/odds/{sport_key} sends for a cache hit,
+    stored with gzip and brotli variants. The version is the refresh time in
+    milliseconds (odds_cache_v2.cached_at), so every worker serving the same
+    refresh reports the same version. The ETag hashes only the odds, so a
+    refresh that changed nothing keeps it. Construction is CPU-bound; use
+    build_snapshot from async code.
+    """
+
+    def __init__(self, sport_key: str, markets: str, odds: List[Dict], version: int):
+        self.sport_key = sport_key
+        self.markets = markets
+        self.odds = odds
+        self.version = version
+        payload = dumps_bytes(odds)
+        # Spliced rather than serialized twice: "odds" leads the object, then the other keys
+        body = b'{"odds":' + payload + b"," + dumps_bytes({"cached": True, "sport_key": sport_key, "version": version})[1:]
+        self.variants = compress_variants(body)
+        self.size = sum(len(variant) for variant in self.variants.values())
+        self.etag = f'"{hashlib.blake2b(payload, digest_size=16).hexdigest()}"'
+        self._index: Optional[Dict[str, Any]] = None
+        self.pricing: Optional["OddsPricing"] = None
+
+    def index(self) -> Dict[str, Any]:
+        """Positions by event id and commence time, and each event's bookmakers by key."""
+        if self._index is None:
+            timeline = []
+            for position, event in enumerate(self.odds):
+                try:
+                    commence = _parse_expires_at(event["commence_time"]).timestamp()
+                except (KeyError, TypeError, ValueError):
+                    commence = float("inf")
+                timeline.append((commence, position))
+            timeline.sort()
+            self._index = {
+                "by_id": {event["id"]: position for position, event in enumerate(self.odds)},
+                "times": [commence for commence, _ in timeline],
+                "timeline": [position for _, position in timeline],
+                "books": [
+                    {bookmaker["key"]: bookmaker for bookmaker in event.get("bookmakers", [])}
+                    for event in self.odds
+                ],
+            }
+        return self._index
+
+ODDS_EVENT_FIELDS = ("id", "sport_key", "sport_title", "commence_time", "home_team", "away_team", "bookmakers")
+
+def project_odds(snapshot: OddsSnapshot, event_ids: Optional[List[str]] = None, bookmakers: Optional[List[str]] = None,
+                 commence_after: Optional[float] = None, commence_before: Optional[float] = None,
+                 fields: Optional[List[str]] = None) -> List[Dict]:
+    index = snapshot.index()
+    if commence_after is not None or commence_before is not None:
+        low = bisect.bisect_left(index["times"], commence_after) if commence_after is not None else 0
+        high = bisect.bisect_left(index["times"], commence_before) if commence_before is not None else len(index["times"])
+        positions = sorted(index["timeline"][low:high])
+        if event_ids is not None:
+            wanted = {index["by_id"].get(event_id) for event_id in event_ids}
+            positions = [position for position in positions if position in wanted]
+    elif event_ids is not None:
+        positions = sorted({index["by_id"][event_id] for event_id in event_ids if event_id in index["by_id"]})
+    else:
+        positions = range(len(snapshot.odds))
+
+    projected = []
+    for position in positions:
+        event = snapshot.odds[position]
+        if bookmakers is not None:
+            books = index["books"][position]
+            event = {**event, "bookmakers": [books[key] for key in bookmakers if key in books]}
+        if fields is not None:
+            event = {field: event[field] for field in fields if field in event}
+        projected.append(event)
+    return projected
+
+def _build_snapshot(sport_key: str, markets: str, odds: List[Dict], version: int) -> OddsSnapshot:
+    snapshot = OddsSnapshot(sport_key, markets, odds, version)
+    if markets == ODDS_POLL_MARKETS:
+        snapshot.pricing = OddsPricing(snapshot)
+        snapshot.size += snapshot.pricing.size
+    return snapshot
+
+async def build_snapshot(sport_key: str, markets: str, odds: List[Dict], version: int) -> OddsSnapshot:
+    return await asyncio.to_thread(_build_snapshot, sport_key, markets, odds, version)
+
+class OddsVersionLog:
+    """Recent refresh versions of one cached market set and the events each refresh changed.
+
+    A refresh loaded from another worker is recorded with unknown changes, which
+    forces a full payload for any delta request that spans it.
+    """
+
+    def __init__(self, size: int):
+        self.current = 0
+        self._entries: deque = deque(maxlen=size)
+
+    def __contains__(self, version: int) -> bool:
+        return any(entry[0] == version for entry in self._entries)
+
+    def record(self, version: int, events: Optional[set], removed_events: List[str]):
+        if version <= self.current:
+            return
+        self._entries.append((version, events, set(removed_events)))
+        self.current = version
+
+    def changes_since(self, version: int) -> Optional[Tuple[set, set]]:
+        if version == self.current:
+            return set(), set()
+        if version not in self:
+            return None
+        events, removed = set(), set()
+        for entry_version, changed, gone in self._entries:
+            if entry_version <= version:
+                continue
+            if changed is None:
+                return None
+            events = (events | changed) - gone
+            removed = (removed | gone) - changed
+        return events, removed
+
+odds_memory_cache = OddsMemoryCache(ODDS_MEMORY_CACHE_MAX_ENTRIES, ODDS_MEMORY_CACHE_MAX_BYTES)
+odds_fetch_flight = SingleFlight()
+odds_versions: Dict[str, OddsVersionLog] = {}
+_odds_revalidations: Dict[str, asyncio.Task] = {}
+
+def odds_version_log(cache_key: str) -> OddsVersionLog:
+    # Keyed like the snapshots: each market set of a sport is refreshed, and versioned, on its own
+    if cache_key not in odds_versions:
+        odds_versions[cache_key] = OddsVersionLog(ODDS_VERSION_HISTORY)
+    return odds_versions[cache_key]
+
+def _version_of(cached_at: datetime) -> int:
+    return int(cached_at.timestamp() * 1000)
+
+def _parse_expires_at(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+def _split_csv(markets: str) -> List[str]:
+    return [market for market in markets.split(",") if market]
+
+def require_sport(sport_key: str):
+    if sport_key not in SUPPORTED_SPORTS:
+        raise HTTPException(status_code=404, detail="Sport not supported")
+
+def canonical_markets(markets: str) -> str:
+    # One spelling per market set, so "spreads,h2h" and "h2h,spreads" share a fetch and a cache row
+    requested = sorted({market.strip() for market in markets.split(",") if market.strip()})
+    unknown = [market for market in requested if market not in ODDS_MARKETS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unsupported markets: {', '.join(unknown)}")
+    if not requested:
+        raise HTTPException(status_code=400, detail="At least one market is required")
+    return ",".join(requested)
+
+def odds_cache_key(sport_key: str, markets: str) -> str:
+    return f"odds_{sport_key}_{markets}"
+
+async def _load_cached_row(sport_key: str, markets: str, cache_key: str, row: Optional[Dict],
+                           allow_stale: bool = False) -> bool:
+    if not row or not row.get("expires_at"):
+        return False
+    expires_at = _parse_expires_at(row["expires_at"])
+    if not allow_stale and expires_at.timestamp() + ODDS_CACHE_STALE_SECONDS <= time.time():
+        return False
+    version = _version_of(_parse_expires_at(row["cached_at"]))
+    current = odds_memory_cache.peek(cache_key)
+    if current is not None and current.version > version:
+        # The row came from a replica that has not caught up with a refresh we already hold
+        return True
+    if current is not None and current.version == version:
+        # Same refresh we already hold; only extend its freshness
+        odds_memory_cache.set(cache_key, current, expires_at, current.size)
+        signal_scanner.scan(current, set(), [], expires_at)
+        return True
+    snapshot = await build_snapshot(sport_key, markets, await load_odds(sport_key, _split_csv(markets)), version)
+    odds_memory_cache.set(cache_key, snapshot, expires_at, snapshot.size)
+    materialize_preview(snapshot)
+    signal_scanner.scan(snapshot, None, [], expires_at)
+    versions = odds_version_log(cache_key)
+    if version not in versions:
+        # A refresh made by another worker; there is no diff, so delta clients get a full payload
+        versions.record(version, None, [])
+        odds_broadcaster.resync(sport_key)
+    return True
+
+def next_poll_interval(odds_data: List[Dict]) -> float:
+    now = datetime.now(timezone.utc)
+    soonest = None
+    for event in odds_data:
+        try:
+            commence = _parse_expires_at(event["commence_time"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        until = (commence - now).total_seconds()
+        # Events that started more than four hours ago are treated as finished
+        if until < -4 * 3600:
+            continue
+        soonest = until if soonest is None else min(soonest, until)
+
+    if soonest is None:
+        return ODDS_POLL_OFFSEASON_SECONDS
+    if soonest <= 1800:
+        interval = ODDS_POLL_LIVE_SECONDS
+    elif soonest <= 3 * 3600:
+        interval = ODDS_POLL_SOON_SECONDS
+    elif soonest <= 24 * 3600:
+        interval = ODDS_POLL_DAY_SECONDS
+    else:
+        interval = ODDS_POLL_IDLE_SECONDS
+
+    remaining = odds_api_quota["remaining"]
+    if remaining is not None:
+        if remaining <= ODDS_QUOTA_CRITICAL:
+            interval = max(interval, ODDS_POLL_OFFSEASON_SECONDS)
+        elif remaining <= ODDS_QUOTA_LOW:
+            interval *= 4
+    return interval
+
+async def store_odds(sport_key: str, markets: str, cache_key: str, odds_data: List[Dict]) -> OddsSnapshot:
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=next_poll_interval(odds_data) + ODDS_POLL_GRACE_SECONDS)
+
+    def write(conn):
+        diff = _ingest_odds(conn, sport_key, _split_csv(markets), odds_data, now)
+        # odds_cache_v2 now only tracks freshness; the odds themselves live in the normalized tables
+        conn.execute("""
+            INSERT OR REPLACE INTO odds_cache_v2 (cache_key, data, cached_at, expires_at)
+            VALUES (?, NULL, ?, ?)
+        """, (cache_key, now.isoformat(), expires_at.isoformat()))
+        _evict_odds_cache(conn)
+        # Read back what _load_cached_row would, so every worker renders this refresh to the same bytes and ETag
+        return diff, _read_odds(conn, sport_key, _split_csv(markets))
+
+    diff, stored = await db_manager.execute_transaction(write)
+    snapshot = await build_snapshot(sport_key, markets, stored, _version_of(now))
+    odds_version_log(cache_key).record(snapshot.version, diff["events"], diff["removed_events"])
+    odds_memory_cache.set(cache_key, snapshot, expires_at, snapshot.size)
+    on_odds_refreshed(snapshot, diff, expires_at)
+    return snapshot
+
+# Rows only track freshness (data is NULL since the normalized tables), so the budget is a row count
+ODDS_CACHE_EVICT_QUERY = """
+    DELETE FROM odds_cache_v2 WHERE cache_key IN (
+        SELECT cache_key FROM odds_cache_v2 ORDER BY cached_at DESC, cache_key LIMIT -1 OFFSET ?
+    )
+"""
+
+def _evict_odds_cache(conn) -> int:
+    return conn.execute(ODDS_CACHE_EVICT_QUERY, (ODDS_CACHE_MAX_ROWS,)).rowcount
+
+def _sweep_odds_cache(conn, now: float) -> Dict[str, int]:
+    # Rows stay loadable for ODDS_CACHE_STALE_SECONDS past expiry (see _load_cached_row), so only
+    # rows beyond that window are dead
+    expired = [
+        cache_key for cache_key, expires_at in conn.execute("SELECT cache_key, expires_at FROM odds_cache_v2").fetchall()
+        if not expires_at or _parse_expires_at(expires_at).timestamp() + ODDS_CACHE_STALE_SECONDS <= now
+    ]
+    conn.executemany("DELETE FROM odds_cache_v2 WHERE cache_key = ?", [(cache_key,) for cache_key in expired])
+    return {"expired": len(expired), "evicted": _evict_odds_cache(conn)}
+
+async def sweep_odds_cache() -> Dict[str, Any]:
+    result = await db_manager.execute_transaction(lambda conn: _sweep_odds_cache(conn, time.time()))
+    result["vacuumed_pages"] = 0
+    if db_manager.is_turso:
+        return result
+
+    def vacuum(conn) -> int:
+        # Only files created with auto_vacuum=INCREMENTAL (see _connect) can give pages back a few at a
+        # time; older files are left alone rather than blocking writes on a full VACUUM
+        if conn.execute("PRAGMA auto_vacuum").fetchall()[0][0] != 2:
+            return 0
+        free = conn.execute("PRAGMA freelist_count").fetchall()[0][0]
+        conn.execute(f"PRAGMA incremental_vacuum({ODDS_CACHE_VACUUM_PAGES})").fetchall()
+        if conn.in_transaction:
+            conn.commit()
+        return free - conn.execute("PRAGMA freelist_count").fetchall()[0][0]
+
+    result["vacuumed_pages"] = await db_manager.write_pool.run(vacuum)
+    return result
+
+def on_odds_refreshed(snapshot: OddsSnapshot, diff: Dict[str, Any], expires_at: datetime):
+    materialize_preview(snapshot)
+    signal_scanner.scan(snapshot, diff["events"], diff["removed_events"], expires_at)
+    odds_broadcaster.publish(snapshot.sport_key, diff)
+
+async def _fetch_and_store_odds(sport_key: str, markets: str, cache_key: str) -> OddsSnapshot:
+    odds_data = await fetch_odds_from_api(sport_key, markets)
+    return await store_odds(sport_key, markets, cache_key, odds_data)
+
+async def refresh_odds(sport_key: str, markets: str, cache_key: str) -> OddsSnapshot:
+    return await odds_fetch_flight.do(
+        (sport_key, markets),
+        lambda: _fetch_and_store_odds(sport_key, markets, cache_key)
+    )
+
+async def revalidate_odds(sport_key: str, markets: str, cache_key: str):
+    row = await db_manager.fetch_one("SELECT * FROM odds_cache_v2 WHERE cache_key = ?", (cache_key,))
+    if row and row.get("expires_at") and _parse_expires_at(row["expires_at"]) > datetime.now(timezone.utc):
+        await _load_cached_row(sport_key, markets, cache_key, row)
+    else:
+        await refresh_odds(sport_key, markets, cache_key)
+
+def _revalidation_done(cache_key: str, task: asyncio.Task):
+    _odds_revalidations.pop(cache_key, None)
+    if not task.cancelled() and task.exception():
+        logger.error(f"Odds revalidation error for {cache_key}: {task.exception()}")
+
+def schedule_odds_revalidation(sport_key: str, markets: str, cache_key: str):
+    if cache_key in _odds_revalidations:
+        return
+    task = asyncio.create_task(revalidate_odds(sport_key, markets, cache_key))
+    _odds_revalidations[cache_key] = task
+    task.add_done_callback(lambda t: _revalidation_done(cache_key, t))
+
+async def get_odds_snapshot(sport_key: str, markets: str) -> Tuple[OddsSnapshot, bool]:
+    cache_key = odds_cache_key(sport_key, markets)
+    
+    row = None
+    snapshot, stale = odds_memory_cache.get(cache_key)
+    if snapshot is None:
+        row = await db_manager.fetch_one("SELECT * FROM odds_cache_v2 WHERE cache_key = ?", (cache_key,))
+        if await _load_cached_row(sport_key, markets, cache_key, row):
+            snapshot, stale = odds_memory_cache.get(cache_key)
+    
+    if snapshot is not None:
+        if stale:
+            schedule_odds_revalidation(sport_key, markets, cache_key)
+        return snapshot, True
+    
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(f"{ODDS_API_BASE_URL}/sports/{sport_key}/odds", params=params)
-            if response.status_code == 200:
-                return response.json()
+        return await refresh_odds(sport_key, markets, cache_key), False
+    except OddsFetchError as e:
+        # Keep serving the last stored odds, however old, while the provider is down
+        if await _load_cached_row(sport_key, markets, cache_key, row, allow_stale=True):
+            logger.warning(f"{e}; serving stored odds")
+            return odds_memory_cache.peek(cache_key), True
+        raise HTTPException(status_code=503, detail="Odds provider unavailable")
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+class OddsPoller:
+    """Refreshes every supported sport on its own cadence so handlers read warm cache.
+
+    The cadence tightens as the next commence_time approaches and backs off when
+    the Odds API quota runs low (see next_poll_interval). Before fetching, the
+    database row is checked so several workers polling the same database do not
+    all spend quota on the same refresh.
+    """
+
+    def __init__(self, sports: List[str], markets: str):
+        self.markets = markets
+        self.next_run: Dict[str, float] = {sport_key: 0.0 for sport_key in sports}
+        self.last_refresh: Dict[str, str] = {}
+        self.refreshes = 0
+        self.skipped = 0
+        self.errors = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            due = [sport_key for sport_key, at in self.next_run.items() if at <= now]
+            if due:
+                await asyncio.gather(*(self._poll(sport_key) for sport_key in due))
+            await asyncio.sleep(max(1.0, min(self.next_run.values()) - time.monotonic()))
+
+    async def _poll(self, sport_key: str):
+        cache_key = odds_cache_key(sport_key, self.markets)
+        try:
+            row = await db_manager.fetch_one("SELECT * FROM odds_cache_v2 WHERE cache_key = ?", (cache_key,))
+            if row and row.get("expires_at"):
+                remaining = (_parse_expires_at(row["expires_at"]) - datetime.now(timezone.utc)).total_seconds()
+                if remaining > ODDS_POLL_GRACE_SECONDS:
+                    # Another worker (or a previous run) already refreshed it
+                    await _load_cached_row(sport_key, self.markets, cache_key, row)
+                    self.skipped += 1
+                    self.next_run[sport_key] = time.monotonic() + remaining - ODDS_POLL_GRACE_SECONDS
+                    return
+            snapshot = await refresh_odds(sport_key, self.markets, cache_key)
+            self.refreshes += 1
+            self.last_refresh[sport_key] = datetime.now(timezone.utc).isoformat()
+            self.next_run[sport_key] = time.monotonic() + next_poll_interval(snapshot.odds)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Odds poller error for {sport_key}: {e}")
+            self.next_run[sport_key] = time.monotonic() + ODDS_POLL_ERROR_SECONDS
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "running": self._task is not None,
+            "refreshes": self.refreshes,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "quota": odds_api_quota,
+            "sports": {
+                sport_key: {
+                    "next_in_seconds": round(max(0.0, at - now), 1),
+                    "last_refresh": self.last_refresh.get(sport_key),
+                }
+                for sport_key, at in self.next_run.items()
+            },
+        }
+
+odds_poller = OddsPoller(list(SUPPORTED_SPORTS.keys()), ODDS_POLL_MARKETS)
+
+class MaintenanceScheduler:
+    """Runs periodic housekeeping jobs one after another on a single background task."""
+
+    def __init__(self):
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, name: str, interval: float, fn):
+        self.jobs[name] = {"interval": interval, "fn": fn, "next_run": time.monotonic() + interval,
+                           "runs": 0, "errors": 0, "last_result": None}
+
+    def start(self):
+        if self._task is None and self.jobs:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            for name, job in self.jobs.items():
+                if job["next_run"] > time.monotonic():
+                    continue
+                try:
+                    job["last_result"] = await job["fn"]()
+                    job["runs"] += 1
+                except Exception as e:
+                    job["errors"] += 1
+                    logger.error(f"Maintenance job {name} failed: {e}")
+                job["next_run"] = time.monotonic() + job["interval"]
+            next_run = min(job["next_run"] for job in self.jobs.values())
+            await asyncio.sleep(max(1.0, next_run - time.monotonic()))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {"runs": job["runs"], "errors": job["errors"], "last_result": job["last_result"]}
+            for name, job in self.jobs.items()
+        }
+
+maintenance = MaintenanceScheduler()
+maintenance.add("compact_odds_history", ODDS_HISTORY_COMPACT_SECONDS, compact_odds_history)
+maintenance.add("sweep_odds_cache", ODDS_CACHE_SWEEP_SECONDS, sweep_odds_cache)
+if db_manager.profile == "tuned":
+    maintenance.add("checkpoint_wal", SQLITE_CHECKPOINT_SECONDS, db_manager.checkpoint)
+
+# ==================== PRICING ENGINE ====================
+
+PRICING_MARKETS = ("h2h", "spreads", "totals")
+
+def _american_to_decimal(prices: np.ndarray) -> np.ndarray:
+    return np.where(prices > 0, 1.0 + prices / 100.0, 1.0 + 100.0 / np.abs(prices))
+
+def _decimal_to_american(decimal: np.ndarray) -> np.ndarray:
+    return np.where(decimal >= 2.0, (decimal - 1.0) * 100.0, -100.0 / (decimal - 1.0))
+
+def _outcome_slots(market: str, event: Dict) -> List[str]:
+    if market == "totals":
+        return ["Over", "Under"]
+    slots = [event.get("home_team"), event.get("away_team")]
+    if market == "h2h":
+        slots.append("Draw")
+    return slots
+
+def _market_arrays(odds: List[Dict], market: str, books: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """American prices and points shaped (event, book, outcome); NaN where a book has no line."""
+    book_positions = {book: position for position, book in enumerate(books)}
+    shape = (len(odds), len(books), 3 if market == "h2h" else 2)
+    prices = np.full(shape, np.nan)
+    points = np.full(shape, np.nan)
+    for event_position, event in enumerate(odds):
+        slots = {name: slot for slot, name in enumerate(_outcome_slots(market, event))}
+        for bookmaker in event.get("bookmakers", []):
+            book_position = book_positions[bookmaker["key"]]
+            for book_market in bookmaker.get("markets", []):
+                if book_market["key"] != market:
+                    continue
+                for outcome in book_market.get("outcomes", []):
+                    slot = slots.get(outcome["name"])
+                    if slot is None or outcome.get("price") is None:
+                        continue
+                    prices[event_position, book_position, slot] = outcome["price"]
+                    if outcome.get("point") is not None:
+                        points[event_position, book_position, slot] = outcome["point"]
+    return prices, points
+
+def _rounded(value: float, digits: int) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), digits)
+
+def price_market(odds: List[Dict], market: str, books: List[str]) -> List[Optional[Dict[str, Any]]]:
+    """Best line, implied and no-vig fair probability, and hold for every event of one market.
+
+    Spreads and totals are priced at the main line, the lower median of the
+    books' numbers, so alternate numbers do not skew the consensus.
+    """
+    if not odds or not books:
+        # Off-season or an empty feed: argmax over an empty book axis would raise
+        return [None] * len(odds)
+    prices, points = _market_arrays(odds, market, books)
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        decimal = _american_to_decimal(prices)
+        if market == "h2h":
+            main_points = np.full((prices.shape[0], prices.shape[2]), np.nan)
+            on_line = ~np.isnan(decimal)
+        else:
+            # The first outcome's line fixes the book's number for the whole market (Over/Under, -x/+x)
+            main_line = np.nanpercentile(points[:, :, 0], 50, axis=1, method="lower")
+            on_line = ~np.isnan(decimal) & (points[:, :, :1] == main_line[:, None, None])
+            main_points = np.nanmax(np.where(on_line, points, np.nan), axis=1)
+        offered = np.any(on_line, axis=1)
+        # A book takes part in the consensus only if it prices every offered outcome at the main line
+        complete = np.all(on_line | ~offered[:, None, :], axis=2) & np.any(on_line, axis=2)
+        implied = np.where(on_line, 1.0 / decimal, np.nan)
+        overround = np.where(complete, np.nansum(implied, axis=2), np.nan)
+        holds = overround - 1.0
+        fair = np.nanmean(implied / overround[:, :, None], axis=1)
+        fair = fair / np.nansum(fair, axis=1, keepdims=True)
+        best_source = np.where(on_line, decimal, -np.inf)
+        best_book = np.argmax(best_source, axis=1)
+        best = np.take_along_axis(best_source, best_book[:, None, :], axis=1)[:, 0, :]
+        best = np.where(np.isfinite(best), best, np.nan)
+        best_american = np.round(_decimal_to_american(best))
+        fair_american = _decimal_to_american(1.0 / fair)
+        expected_value = best * fair - 1.0
+        average_hold = np.nanmean(holds, axis=1)
+
+    results: List[Optional[Dict[str, Any]]] = []
+    for event_position, event in enumerate(odds):
+        if not offered[event_position].any():
+            results.append(None)
+            continue
+        outcomes = []
+        for slot, name in enumerate(_outcome_slots(market, event)):
+            if not offered[event_position, slot]:
+                continue
+            outcomes.append({
+                "name": name,
+                "point": _rounded(main_points[event_position, slot], 2),
+                "best_price": int(best_american[event_position, slot]),
+                "best_bookmaker": books[best_book[event_position, slot]],
+                "implied_probability": _rounded(1.0 / best[event_position, slot], 4),
+                "fair_probability": _rounded(fair[event_position, slot], 4),
+                "fair_price": _rounded(fair_american[event_position, slot], 1),
+                "expected_value": _rounded(expected_value[event_position, slot], 4),
+            })
+        results.append({
+            "outcomes": outcomes,
+            "holds": {
+                book: round(float(holds[event_position, book_position]), 4)
+                for book_position, book in enumerate(books)
+                if complete[event_position, book_position]
+            },
+            "average_hold": _rounded(average_hold[event_position], 4),
+        })
+    return results
+
+class OddsPricing:
+    """Pricing metrics for every event of one snapshot, computed once per refresh.
+
+    Built alongside the snapshot in build_snapshot's worker thread; the
+    /api/pricing routes only look events up and send the rendered bytes.
+    """
+
+    def __init__(self, snapshot: OddsSnapshot):
+        markets = [market for market in _split_csv(snapshot.markets) if market in PRICING_MARKETS]
+        books = sorted({bookmaker["key"] for event in snapshot.odds for bookmaker in event.get("bookmakers", [])})
+        self.events: Dict[str, Dict[str, Any]] = {
+            event["id"]: {
+                "id": event["id"],
+                "commence_time": event.get("commence_time"),
+                "home_team": event.get("home_team"),
+                "away_team": event.get("away_team"),
+                "markets": {},
+            }
+            for event in snapshot.odds
+        }
+        for market in markets:
+            for event, priced in zip(snapshot.odds, price_market(snapshot.odds, market, books)):
+                if priced is not None:
+                    self.events[event["id"]]["markets"][market] = priced
+        body = dumps_bytes({
+            "events": list(self.events.values()),
+            "sport_key": snapshot.sport_key,
+            "version": snapshot.version,
+        })
+        self.variants = compress_variants(body)
+        self.size = sum(len(variant) for variant in self.variants.values())
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+# ==================== SIGNALS ====================
+
+def _american_price_to_decimal(price: float) -> float:
+    return 1.0 + price / 100.0 if price > 0 else 1.0 + 100.0 / abs(price)
+
+def evaluate_event_signals(sport_key: str, event: Dict[str, Any], detected_at: str) -> List[Dict[str, Any]]:
+    """Arbitrage and +EV signals for one priced event (an OddsPricing.events entry)."""
+    signals = []
+    for market, priced in event["markets"].items():
+        outcomes = priced["outcomes"]
+        base = {
+            "sport_key": sport_key,
+            "event_id": event["id"],
+            "home_team": event["home_team"],
+            "away_team": event["away_team"],
+            "commence_time": event["commence_time"],
+            "market": market,
+            "detected_at": detected_at,
+        }
+        if len(outcomes) >= 2:
+            total = sum(1.0 / _american_price_to_decimal(outcome["best_price"]) for outcome in outcomes)
+            if total < 1.0:
+                signals.append({
+                    **base,
+                    "type": "arbitrage",
+                    "edge": round(1.0 - total, 4),
+                    "legs": [
+                        {
+                            "name": outcome["name"],
+                            "point": outcome["point"],
+                            "price": outcome["best_price"],
+                            "bookmaker": outcome["best_bookmaker"],
+                            "stake_share": round((1.0 / _american_price_to_decimal(outcome["best_price"])) / total, 4),
+                        }
+                        for outcome in outcomes
+                    ],
+                })
+        if len(priced["holds"]) < ODDS_SIGNAL_MIN_BOOKS:
+            continue
+        for outcome in outcomes:
+            if outcome["expected_value"] is not None and outcome["expected_value"] >= ODDS_SIGNAL_MIN_EV:
+                signals.append({
+                    **base,
+                    "type": "positive_ev",
+                    "edge": outcome["expected_value"],
+                    "name": outcome["name"],
+                    "point": outcome["point"],
+                    "price": outcome["best_price"],
+                    "bookmaker": outcome["best_bookmaker"],
+                    "fair_price": outcome["fair_price"],
+                    "fair_probability": outcome["fair_probability"],
+                })
+    return signals
+
+class SignalScanner:
+    """Arbitrage and +EV signals across every sport, kept current per refresh.
+
+    Only events a refresh changed are re-evaluated; the others keep their
+    signals and just take the new freshness deadline. A signal expires when
+    its refresh goes stale or its event starts, whichever is first.
+    """
+
+    def __init__(self):
+        self.signals: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        self.expires_at: Dict[str, float] = {}
+        self._ranked: Optional[List[Tuple[float, Dict[str, Any]]]] = None
+        self.scans = 0
+        self.evaluated = 0
+
+    def scan(self, snapshot: OddsSnapshot, changed: Optional[set], removed: List[str], expires_at: datetime):
+        """Re-evaluate changed event ids; None means the changes are unknown, so every event."""
+        if snapshot.pricing is None:
+            return
+        sport_signals = self.signals.setdefault(snapshot.sport_key, {})
+        events = snapshot.pricing.events
+        for event_id in removed:
+            sport_signals.pop(event_id, None)
+        if changed is None:
+            sport_signals.clear()
+            changed = set(events)
+        detected_at = datetime.now(timezone.utc).isoformat()
+        for event_id in changed:
+            event = events.get(event_id)
+            signals = evaluate_event_signals(snapshot.sport_key, event, detected_at) if event else []
+            if signals:
+                sport_signals[event_id] = signals
             else:
-                logger.error(f"Odds API error: {response.status_code}")
-                return []
-    except Exception as e:
-        logger.error(f"Odds API fetch error: {e}")
-        return []
+                sport_signals.pop(event_id, None)
+        self.expires_at[snapshot.sport_key] = expires_at.timestamp()
+        self.scans += 1
+        self.evaluated += len(changed)
+        self._ranked = None
+
+    def _expiry(self, signal: Dict[str, Any]) -> float:
+        expires = self.expires_at.get(signal["sport_key"], 0.0)
+        try:
+            return min(expires, _parse_expires_at(signal["commence_time"]).timestamp())
+        except (TypeError, ValueError):
+            return expires
+
+    def ranked(self) -> List[Dict[str, Any]]:
+        if self._ranked is None:
+            entries = [
+                (self._expiry(signal), signal)
+                for sport_signals in self.signals.values()
+                for event_signals in sport_signals.values()
+                for signal in event_signals
+            ]
+            entries.sort(key=lambda entry: entry[1]["edge"], reverse=True)
+            self._ranked = entries
+        now = time.time()
+        return [
+            {**signal, "expires_at": datetime.fromtimestamp(expires, timezone.utc).isoformat()}
+            for expires, signal in self._ranked
+            if expires > now
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "signals": sum(len(signals) for sport in self.signals.values() for signals in sport.values()),
+            "scans": self.scans,
+            "events_evaluated": self.evaluated,
+        }
+
+signal_scanner = SignalScanner()
+
+# ==================== SETTLEMENT ====================
+
+def _normalize_result(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Final score from an Odds API scores entry or a flat {event_id, home_score, away_score} record."""
+    if item.get("completed") is False:
+        return None
+    event_id = item.get("event_id") or item.get("id")
+    home_score, away_score = item.get("home_score"), item.get("away_score")
+    if item.get("scores"):
+        scores = {score["name"]: score["score"] for score in item["scores"]}
+        home_score, away_score = scores.get(item.get("home_team")), scores.get(item.get("away_team"))
+    if not event_id or home_score is None or away_score is None:
+        return None
+    try:
+        return {
+            "event_id": event_id,
+            "sport_key": item.get("sport_key"),
+            "home_team": item.get("home_team"),
+            "away_team": item.get("away_team"),
+            "home_score": float(home_score),
+            "away_score": float(away_score),
+        }
+    except (TypeError, ValueError):
+        return None
+
+class FileResultsSource:
+    """Final scores from a local JSON file, in Odds API scores format or flat records."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    async def fetch(self, sport_keys: List[str]) -> List[Dict[str, Any]]:
+        if not self.path.exists():
+            return []
+        items = await asyncio.to_thread(lambda: json.loads(self.path.read_text()))
+        results = [_normalize_result(item) for item in items]
+        return [
+            result for result in results
+            if result is not None and (result["sport_key"] is None or result["sport_key"] in sport_keys)
+        ]
+
+class OddsApiResultsSource:
+    """Final scores from the Odds API scores endpoint."""
+
+    async def fetch(self, sport_keys: List[str]) -> List[Dict[str, Any]]:
+        responses = await asyncio.gather(
+            *(fetch_scores_from_api(sport_key, SETTLEMENT_SCORES_DAYS) for sport_key in sport_keys)
+        )
+        results = [_normalize_result(item) for items in responses for item in items]
+        return [result for result in results if result is not None]
+
+def create_results_source():
+    if SETTLEMENT_RESULTS_SOURCE == "odds_api":
+        return OddsApiResultsSource()
+    return FileResultsSource(SETTLEMENT_RESULTS_FILE)
+
+# Grades each pending bet with a final score as a margin: > 0 won, 0 push, < 0 lost, NULL void
+# Stake times decimal odds for an American price; anything else only returns the stake
+BET_PAYOUT_SQL = """
+    CASE WHEN {odds} >= 100 THEN {amount} * (1 + {odds} / 100.0)
+         WHEN {odds} <= -100 THEN {amount} * (1 + 100.0 / -{odds})
+         ELSE {amount} END
+"""
+
+def bet_payout(odds: float, amount: float) -> float:
+    if odds >= 100:
+        return round(amount * (1 + odds / 100), 2)
+    if odds <= -100:
+        return round(amount * (1 + 100 / -odds), 2)
+    return amount
+
+SETTLEMENT_GRADE_QUERY = f"""
+    INSERT INTO settlement_batch (id, user_id, amount, payout, outcome)
+    SELECT id, user_id, amount, ROUND({BET_PAYOUT_SQL.format(odds="odds", amount="amount")}, 2),
+        CASE WHEN margin IS NULL THEN 'void' WHEN margin > 0 THEN 'won' WHEN margin = 0 THEN 'push' ELSE 'lost' END
+    FROM (
+        SELECT b.id, b.user_id, b.amount, b.odds,
+            CASE b.bet_type
+                WHEN 'h2h' THEN CASE b.selected_team
+                    WHEN b.home_team THEN r.home_score - r.away_score
+                    WHEN b.away_team THEN r.away_score - r.home_score
+                    WHEN 'Draw' THEN CASE WHEN r.home_score = r.away_score THEN 1 ELSE -1 END
+                END
+                WHEN 'spreads' THEN CASE b.selected_team
+                    WHEN b.home_team THEN r.home_score - r.away_score + b.point
+                    WHEN b.away_team THEN r.away_score - r.home_score + b.point
+                END
+                WHEN 'totals' THEN CASE b.selected_team
+                    WHEN 'Over' THEN r.home_score + r.away_score - b.point
+                    WHEN 'Under' THEN b.point - r.home_score - r.away_score
+                END
+            END AS margin
+        FROM bets_v2 b
+        JOIN event_results r ON r.event_id = b.event_id
+        WHERE b.status = 'pending'
+        LIMIT ?
+    )
+"""
+
+def _settle_batch(conn, batch_size: int, settled_at: str) -> Dict[str, int]:
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS settlement_batch (
+            id TEXT PRIMARY KEY, user_id TEXT, amount REAL, payout REAL, outcome TEXT
+        )
+    """)
+    conn.execute("DELETE FROM settlement_batch")
+    conn.execute(SETTLEMENT_GRADE_QUERY, (batch_size,))
+    # Winners are paid the full payout, pushes and voids get their stake back
+    conn.execute("""
+        UPDATE wallet_v2 SET
+            balance = COALESCE(balance, 0) + (
+                SELECT SUM(CASE s.outcome WHEN 'won' THEN s.payout WHEN 'lost' THEN 0 ELSE s.amount END)
+                FROM settlement_batch s WHERE s.user_id = wallet_v2.user_id
+            ),
+            total_won = COALESCE(total_won, 0) + (
+                SELECT SUM(CASE s.outcome WHEN 'won' THEN s.payout - s.amount ELSE 0 END)
+                FROM settlement_batch s WHERE s.user_id = wallet_v2.user_id
+            ),
+            total_lost = COALESCE(total_lost, 0) + (
+                SELECT SUM(CASE s.outcome WHEN 'lost' THEN s.amount ELSE 0 END)
+                FROM settlement_batch s WHERE s.user_id = wallet_v2.user_id
+            ),
+            updated_at = ?
+        WHERE user_id IN (SELECT user_id FROM settlement_batch)
+    """, (settled_at,))
+    # The stored payout is rewritten to what was paid, so user_stats profit matches the wallet
+    conn.execute("""
+        UPDATE bets_v2 SET status = s.outcome, settled_at = ?, potential_payout = s.payout
+        FROM settlement_batch s WHERE bets_v2.id = s.id
+    """, (settled_at,))
+    counts = {"won": 0, "lost": 0, "push": 0, "void": 0}
+    for outcome, count in conn.execute("SELECT outcome, COUNT(*) FROM settlement_batch GROUP BY outcome").fetchall():
+        counts[outcome] = count
+    return counts
+
+def _store_results(conn, results: List[Dict[str, Any]], updated_at: str):
+    conn.executemany("""
+        INSERT INTO event_results (event_id, sport_key, home_team, away_team, home_score, away_score, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (event_id) DO UPDATE SET
+            home_score = excluded.home_score, away_score = excluded.away_score, updated_at = excluded.updated_at
+    """, [
+        (result["event_id"], result["sport_key"], result["home_team"], result["away_team"],
+         result["home_score"], result["away_score"], updated_at)
+        for result in results
+    ])
+
+class SettlementEngine:
+    """Grades pending bets against final scores in set-based batches.
+
+    Each batch is one write transaction that grades up to
+    SETTLEMENT_BATCH_SIZE bets into a temp table, credits every affected
+    wallet from it, and marks the bets settled, so bets and wallets never
+    disagree.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.runs = 0
+        self.settled = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    async def run(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc).isoformat()
+        rows = await db_manager.execute(
+            "SELECT DISTINCT sport_key FROM bets_v2 WHERE status = 'pending' AND (commence_time IS NULL OR commence_time <= ?)",
+            (now,)
+        )
+        sport_keys = [row["sport_key"] for row in rows]
+        results = await self.source.fetch(sport_keys) if sport_keys else []
+        if results:
+            await db_manager.execute_transaction(lambda conn: _store_results(conn, results, now))
+
+        totals = {"won": 0, "lost": 0, "push": 0, "void": 0}
+        batches = 0
+        while True:
+            counts = await db_manager.execute_transaction(
+                lambda conn: _settle_batch(conn, SETTLEMENT_BATCH_SIZE, now)
+            )
+            batches += 1
+            for outcome, count in counts.items():
+                totals[outcome] += count
+            if sum(counts.values()) < SETTLEMENT_BATCH_SIZE:
+                break
+
+        settled = sum(totals.values())
+        if settled:
+            principal_cache.invalidate_wallets()
+        self.runs += 1
+        self.settled += settled
+        self.last_run = {
+            "results": len(results),
+            "settled": settled,
+            "batches": batches,
+            "seconds": round(time.perf_counter() - started, 3),
+            **totals,
+        }
+        if settled:
+            logger.info(f"Settled {settled} bets in {batches} batches")
+        return self.last_run
+
+    def stats(self) -> Dict[str, Any]:
+        return {"runs": self.runs, "settled": self.settled, "last_run": self.last_run}
+
+settlement_engine = SettlementEngine(create_results_source())
+maintenance.add("settle_bets", SETTLEMENT_INTERVAL_SECONDS, settlement_engine.run)
+
+# ==================== ODDS PREVIEW ====================
+
+PREVIEW_SPORTS = list(SUPPORTED_SPORTS.keys())[:4]
+PREVIEW_GAMES = 3
+
+odds_preview: Dict[str, Dict[str, Any]] = {}
+_preview_rendered: Optional[Tuple[Dict[str, bytes], str]] = None
+
+def build_sport_preview(sport_key: str, odds_data: List[Dict]) -> Dict[str, Any]:
+    games = []
+    for event in odds_data[:PREVIEW_GAMES]:
+        bookmakers = []
+        for bookmaker in event.get("bookmakers", []):
+            h2h = [market for market in bookmaker.get("markets", []) if market["key"] == "h2h"]
+            if h2h:
+                bookmakers.append({**bookmaker, "markets": h2h})
+        games.append({**event, "bookmakers": bookmakers})
+    return {"title": SUPPORTED_SPORTS[sport_key]["title"], "games": games}
+
+def materialize_preview(snapshot: OddsSnapshot):
+    # The preview is cut from the full poller payload so it never costs its own upstream fetch
+    if snapshot.sport_key not in PREVIEW_SPORTS or snapshot.markets != ODDS_POLL_MARKETS:
+        return
+    global _preview_rendered
+    preview = build_sport_preview(snapshot.sport_key, snapshot.odds)
+    digest = hashlib.blake2b(dumps_bytes(preview), digest_size=16).hexdigest()
+    entry = odds_preview.get(snapshot.sport_key)
+    if entry is not None and entry["hash"] == digest:
+        entry["source"] = snapshot
+        return
+    odds_preview[snapshot.sport_key] = {
+        "source": snapshot,
+        "preview": preview,
+        "hash": digest,
+        "version": snapshot.version,
+    }
+    _preview_rendered = None
+
+def blank_preview(sport_key: str):
+    # Stands in for a sport whose odds are unavailable, so one provider outage doesn't fail the whole preview
+    global _preview_rendered
+    preview = build_sport_preview(sport_key, [])
+    odds_preview[sport_key] = {
+        "source": None,
+        "preview": preview,
+        "hash": hashlib.blake2b(dumps_bytes(preview), digest_size=16).hexdigest(),
+        "version": 0,
+    }
+    _preview_rendered = None
+
+def preview_version() -> int:
+    return max(odds_preview[sport_key]["version"] for sport_key in PREVIEW_SPORTS)
+
+def render_preview() -> Tuple[Dict[str, bytes], str]:
+    global _preview_rendered
+    if _preview_rendered is None:
+        combined = "".join(odds_preview[sport_key]["hash"] for sport_key in PREVIEW_SPORTS)
+        etag = f'"{hashlib.blake2b(combined.encode(), digest_size=16).hexdigest()}"'
+        body = dumps_bytes({
+            "preview": {sport_key: odds_preview[sport_key]["preview"] for sport_key in PREVIEW_SPORTS},
+            "version": preview_version(),
+        })
+        _preview_rendered = (compress_variants(body), etag)
+    return _preview_rendered
+
+# ==================== ODDS STREAM ====================
+
+def _sse(event: str, data: Any) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps_bytes(data) + b"\n\n"
+
+class OddsSubscriber:
+    def __init__(self, sports: List[str]):
+        self.sports = set(sports)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=ODDS_STREAM_QUEUE_SIZE)
+        self.needs_resync = False
+
+class OddsBroadcaster:
+    """Fans refresh diffs out from one task to every open odds stream.
+
+    Each diff is encoded once and pushed onto per-connection bounded queues. A
+    connection that falls behind is not allowed to buffer without limit: its
+    queue is left as is and it is told to resync from a fresh snapshot instead.
+    """
+
+    def __init__(self):
+        self._inbox: Optional[asyncio.Queue] = None
+        self._subscribers: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self._snapshots: Dict[str, Tuple[Any, bytes]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+
+    def start(self):
+        if self._task is None:
+            self._inbox = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._inbox = None
+
+    def subscribe(self, sports: List[str]) -> OddsSubscriber:
+        subscriber = OddsSubscriber(sports)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: OddsSubscriber):
+        self._subscribers.discard(subscriber)
+
+    def publish(self, sport_key: str, diff: Dict[str, Any]):
+        if self._inbox is None or not self._subscribers:
+            return
+        if diff["changed"] or diff["removed"] or diff["removed_events"]:
+            self._inbox.put_nowait((sport_key, diff))
+
+    def resync(self, sport_key: str):
+        for subscriber in self._subscribers:
+            if sport_key in subscriber.sports:
+                self._flag_resync(subscriber)
+
+    def _flag_resync(self, subscriber: OddsSubscriber):
+        subscriber.needs_resync = True
+        try:
+            # Wake the connection if it is idle waiting on its queue
+            subscriber.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    async def _run(self):
+        while True:
+            sport_key, diff = await self._inbox.get()
+            message = _sse("diff", {
+                "sport_key": sport_key,
+                "changed": [
+                    {"event_id": event_id, "bookmaker": bookmaker, "market": market,
+                     "outcome": outcome, "price": price, "point": point}
+                    for event_id, bookmaker, market, outcome, price, point in diff["changed"]
+                ],
+                "removed": [
+                    {"event_id": event_id, "bookmaker": bookmaker, "market": market, "outcome": outcome}
+                    for event_id, bookmaker, market, outcome in diff["removed"]
+                ],
+                "removed_events": diff["removed_events"],
+            })
+            self.published += 1
+            for subscriber in list(self._subscribers):
+                if sport_key not in subscriber.sports or subscriber.needs_resync:
+                    continue
+                try:
+                    subscriber.queue.put_nowait(message)
+                    self.delivered += 1
+                except asyncio.QueueFull:
+                    self.overflows += 1
+                    subscriber.needs_resync = True
+
+    async def snapshot(self, sport_key: str) -> bytes:
+        snapshot, _ = await get_odds_snapshot(sport_key, ODDS_POLL_MARKETS)
+        cached = self._snapshots.get(sport_key)
+        # Encode each payload once no matter how many connections ask for it
+        if cached is None or cached[0] is not snapshot:
+            cached = (snapshot, _sse("snapshot", {
+                "sport_key": sport_key, "version": snapshot.version, "odds": snapshot.odds
+            }))
+            self._snapshots[sport_key] = cached
+        return cached[1]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+        }
+
+odds_broadcaster = OddsBroadcaster()
+
+async def _odds_event_stream(request: Request, subscriber: OddsSubscriber):
+    try:
+        for sport_key in sorted(subscriber.sports):
+            yield await odds_broadcaster.snapshot(sport_key)
+        while True:
+            if subscriber.needs_resync:
+                subscriber.needs_resync = False
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                for sport_key in sorted(subscriber.sports):
+                    yield await odds_broadcaster.snapshot(sport_key)
+                continue
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), ODDS_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield b": heartbeat\n\n"
+                continue
+            if message is not None:
+                yield message
+    finally:
+        odds_broadcaster.unsubscribe(subscriber)
 
 # ==================== ROUTES ====================
 
@@ -266,21 +2974,41 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+@api_router.get("/metrics")
+async def metrics(current_user: dict = Depends(get_admin_user)):
+    return {
+        "db": db_manager.stats(),
+        "odds_cache": odds_memory_cache.stats(),
+        "odds_fetch": odds_fetch_flight.stats(),
+        "odds_poller": odds_poller.stats(),
+        "maintenance": maintenance.stats(),
+        "odds_stream": odds_broadcaster.stats(),
+        "signals": signal_scanner.stats(),
+        "settlement": settlement_engine.stats(),
+        "principal_cache": principal_cache.stats(),
+        "password_hashing": password_hasher.stats(),
+    }
+
 @api_router.get("/version")
 async def version():
-    return {"version": "2.0.1", "hashing": "sha256"}
+    return {"version": "2.0.1", "hashing": "bcrypt"}
 
 # --- AUTH ROUTES ---
 
 @api_router.post("/register", response_model=Token)
 async def register(user: UserCreate):
-    existing_user = await db_manager.fetch_one("SELECT * FROM users_v2 WHERE username = ?", (user.username,))
+    existing_user = await db_manager.fetch_one("SELECT * FROM users_v2 WHERE username = ?", (user.username,), primary=True)
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already registered")
     
+    if len(user.password.encode()) > BCRYPT_MAX_PASSWORD_BYTES:
+        raise HTTPException(status_code=400, detail=f"Password must be at most {BCRYPT_MAX_PASSWORD_BYTES} bytes")
+    
+    hashed_password = await password_hasher.hash(user.password)
     try:
         user_id = str(uuid.uuid4())
-        hashed_password = get_password_hash(user.password)
+        # Record the writes against the new user so their first authenticated reads see them
+        current_principal.set(user_id)
         
         await db_manager.execute_write(
             "INSERT INTO users_v2 (id, username, email, hashed_password, created_at) VALUES (?, ?, ?, ?, ?)",
@@ -304,14 +3032,22 @@ async def register(user: UserCreate):
 
 @api_router.post("/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = await db_manager.fetch_one("SELECT * FROM users_v2 WHERE username = ?", (form_data.username,))
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    # Nobody is authenticated yet, so read-your-writes cannot route this; a just-registered user must be found
+    user = await db_manager.fetch_one("SELECT * FROM users_v2 WHERE username = ?", (form_data.username,), primary=True)
+    valid, needs_rehash = await password_hasher.verify(form_data.password, user["hashed_password"]) if user else (False, False)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    if needs_rehash:
+        try:
+            await rehash_password(user, form_data.password)
+        except Exception as e:
+            logger.error(f"Password rehash error: {e}")
+    
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user["username"], "user_id": user["id"]}, expires_delta=access_token_expires
@@ -332,113 +3068,226 @@ async def read_users_me(current_user: dict = Depends(get_current_user)):
 @api_router.get("/wallet")
 async def get_wallet_route(current_user: dict = Depends(get_current_user)):
     user_id = current_user["id"]
+    wallet = principal_cache.get_wallet(user_id)
+    if wallet is not None:
+        return wallet
     wallet = await db_manager.fetch_one("SELECT * FROM wallet_v2 WHERE user_id = ?", (user_id,))
     if not wallet:
         wallet_id = str(uuid.uuid4())
         await db_manager.execute_write(
-            "INSERT INTO wallet_v2 (id, user_id, balance, updated_at) VALUES (?, ?, ?, ?)",
+            "INSERT OR IGNORE INTO wallet_v2 (id, user_id, balance, updated_at) VALUES (?, ?, ?, ?)",
             (wallet_id, user_id, 1000.0, datetime.now(timezone.utc).isoformat())
         )
         wallet = await db_manager.fetch_one("SELECT * FROM wallet_v2 WHERE user_id = ?", (user_id,))
+    principal_cache.set_wallet(user_id, wallet)
     return wallet
 
 @api_router.post("/wallet/update")
 async def update_wallet_route(update: WalletUpdate, current_user: dict = Depends(get_current_user)):
     user_id = current_user["id"]
-    wallet = await get_wallet_route(current_user)
-    current_balance = wallet["balance"]
-    
-    if update.action == "deposit":
-        new_balance = current_balance + update.amount
-    elif update.action == "withdraw":
-        if update.amount > current_balance:
-            raise HTTPException(status_code=400, detail="Insufficient balance")
-        new_balance = current_balance - update.amount
-    else:
+    if update.action not in ("deposit", "withdraw"):
         raise HTTPException(status_code=400, detail="Invalid action")
+    if update.amount <= 0:
+        raise HTTPException(status_code=400, detail="Amount must be positive")
     
-    await db_manager.execute_write(
-        "UPDATE wallet_v2 SET balance = ?, updated_at = ? WHERE user_id = ?",
-        (new_balance, datetime.now(timezone.utc).isoformat(), user_id)
+    # Relative, conditional updates: a cached or concurrent balance read can never be written back
+    await get_wallet_route(current_user)
+    delta = update.amount if update.action == "deposit" else -update.amount
+    rows = await db_manager.execute_returning(
+        "UPDATE wallet_v2 SET balance = balance + ?, updated_at = ? WHERE user_id = ? AND balance + ? >= 0 "
+        "RETURNING balance",
+        (delta, datetime.now(timezone.utc).isoformat(), user_id, delta)
     )
+    principal_cache.invalidate_wallet(user_id)
+    if not rows:
+        raise HTTPException(status_code=400, detail="Insufficient balance")
     
-    return {"balance": new_balance, "action": update.action}
+    return {"balance": rows[0]["balance"], "action": update.action}
 
 # --- BETTING ROUTES ---
 
 @api_router.post("/bets")
 async def place_bet(bet: BetCreate, current_user: dict = Depends(get_current_user)):
     user_id = current_user["id"]
-    wallet = await get_wallet_route(current_user)
-    
-    if bet.amount > wallet["balance"]:
-        raise HTTPException(status_code=400, detail="Insufficient balance")
+    if bet.amount <= 0:
+        raise HTTPException(status_code=400, detail="Bet amount must be positive")
+    if -100 < bet.odds < 100:
+        raise HTTPException(status_code=400, detail="Odds must be an American price")
     
     bet_id = str(uuid.uuid4())
     created_at = datetime.now(timezone.utc).isoformat()
-    
-    await db_manager.execute_write("""
-        INSERT INTO bets_v2 (id, user_id, event_id, sport_key, sport_title, home_team, away_team,
-                        selected_team, bet_type, odds, amount, potential_payout, status,
-                        created_at, commence_time)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending', ?, ?)
-    """, (
-        bet_id, user_id, bet.event_id, bet.sport_key, bet.sport_title, bet.home_team,
-        bet.away_team, bet.selected_team, bet.bet_type, bet.odds, bet.amount,
-        bet.potential_payout, created_at, bet.commence_time
-    ))
-    
-    new_balance = wallet["balance"] - bet.amount
-    total_wagered = (wallet.get("total_wagered") or 0) + bet.amount
-    
-    await db_manager.execute_write(
-        "UPDATE wallet_v2 SET balance = ?, total_wagered = ? WHERE user_id = ?",
-        (new_balance, total_wagered, user_id)
+    params = (
+        bet_id, user_id, bet.selected_team, bet.bet_type, bet.odds, bet.amount,
+        bet_payout(bet.odds, bet.amount), created_at, bet.point, bet.event_id, created_at,
+        bet.bet_type, bet.selected_team, bet.odds, bet.point
     )
     
-    return {"message": "Bet placed successfully", "new_balance": new_balance}
+    # The bets_v2_debit_wallet trigger checks and debits the balance inside this INSERT,
+    # so concurrent bets cannot overspend and the happy path is one round trip. Event details
+    # come from odds_events, and nothing is inserted unless the event has yet to start and a
+    # bookmaker currently posts this exact price (and point) for the selection.
+    for attempt in range(2):
+        try:
+            rows = await db_manager.execute_returning("""
+                INSERT INTO bets_v2 (id, user_id, event_id, sport_key, sport_title, home_team, away_team,
+                                selected_team, bet_type, odds, amount, potential_payout, status,
+                                created_at, commence_time, point)
+                SELECT ?, ?, e.event_id, e.sport_key, e.sport_title, e.home_team, e.away_team,
+                       ?, ?, ?, ?, ?, 'pending', ?, e.commence_time, ?
+                FROM odds_events e
+                WHERE e.event_id = ? AND julianday(e.commence_time) > julianday(?)
+                  AND EXISTS (
+                      SELECT 1 FROM odds_outcomes o
+                      WHERE o.event_id = e.event_id AND o.market = ? AND o.outcome = ?
+                        AND o.price = ? AND o.point IS ?
+                  )
+                RETURNING (SELECT balance FROM wallet_v2 WHERE user_id = bets_v2.user_id) AS balance
+            """, params)
+        except Exception as e:
+            if "Insufficient balance" not in str(e):
+                logger.error(f"Place bet error: {e}")
+                raise HTTPException(status_code=500, detail=f"Database Error: {str(e)}")
+        else:
+            if not rows:
+                raise HTTPException(status_code=400, detail="Event or line is not open for betting")
+            principal_cache.invalidate_wallet(user_id)
+            return {"message": "Bet placed successfully", "new_balance": rows[0]["balance"]}
+        # Users created before wallets were provisioned at registration get one on first use
+        principal_cache.invalidate_wallet(user_id)
+        wallet = await get_wallet_route(current_user)
+        if attempt or bet.amount > wallet["balance"]:
+            break
+    raise HTTPException(status_code=400, detail="Insufficient balance")
 
-@api_router.get("/bets")
-async def get_bets(bet_status: Optional[str] = None, current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
-    query = "SELECT * FROM bets_v2 WHERE user_id = ?"
-    params = [user_id]
-    
+BET_FIELDS = (
+    "id", "user_id", "event_id", "sport_key", "sport_title", "home_team", "away_team", "selected_team",
+    "bet_type", "odds", "amount", "potential_payout", "status", "created_at", "commence_time", "point",
+    "settled_at",
+)
+BET_EXPORT_PAGE_SIZE = 1000
+
+def encode_bet_cursor(bet: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(dumps_bytes([bet["created_at"], bet["id"]])).rstrip(b"=").decode()
+
+def decode_bet_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, bet_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(created_at, str) or not isinstance(bet_id, str):
+            raise ValueError("cursor must hold two strings")
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+    return created_at, bet_id
+
+def _bet_columns(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(BET_FIELDS)
+    requested = _split_csv(fields)
+    unknown = [field for field in requested if field not in BET_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    # The cursor is built from created_at and id, so every page carries them
+    return ["id", "created_at"] + [field for field in requested if field not in ("id", "created_at")]
+
+async def fetch_bets_page(user_id: str, bet_status: Optional[str], columns: List[str], limit: int,
+                          after: Optional[Tuple[str, str]] = None) -> List[Dict]:
+    # Keyset pagination on (created_at, id) walks idx_bets_v2_user_*_created_id in order, at any depth
+    query = f"SELECT {', '.join(columns)} FROM bets_v2 WHERE user_id = ?"
+    params: List[Any] = [user_id]
     if bet_status:
         query += " AND status = ?"
         params.append(bet_status)
-    
-    query += " ORDER BY created_at DESC LIMIT 100"
-    
-    bets = await db_manager.execute(query, tuple(params))
-    return {"bets": bets, "count": len(bets)}
+    if after is not None:
+        query += " AND (created_at, id) < (?, ?)"
+        params.extend(after)
+    query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+    params.append(limit)
+    return await db_manager.execute(query, tuple(params))
+
+@api_router.get("/bets")
+async def get_bets(
+    bet_status: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated bet columns"),
+    current_user: dict = Depends(get_current_user)
+):
+    columns = _bet_columns(fields)
+    after = decode_bet_cursor(cursor) if cursor else None
+    bets = await fetch_bets_page(current_user["id"], bet_status or status_filter, columns, limit + 1, after)
+    next_cursor = encode_bet_cursor(bets[limit - 1]) if len(bets) > limit else None
+    bets = bets[:limit]
+    return {"bets": bets, "count": len(bets), "next_cursor": next_cursor}
+
+async def _export_bets(user_id: str, bet_status: Optional[str], columns: List[str], export_format: str):
+    after = None
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue().encode()
+    while True:
+        bets = await fetch_bets_page(user_id, bet_status, columns, BET_EXPORT_PAGE_SIZE, after)
+        if not bets:
+            return
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows([bet[column] for column in columns] for bet in bets)
+            yield buffer.getvalue().encode()
+        else:
+            yield b"".join(dumps_bytes(bet) + b"\n" for bet in bets)
+        if len(bets) < BET_EXPORT_PAGE_SIZE:
+            return
+        after = (bets[-1]["created_at"], bets[-1]["id"])
+
+@api_router.get("/bets/export")
+async def export_bets(
+    export_format: str = Query("ndjson", alias="format", description="ndjson or csv"),
+    bet_status: Optional[str] = Query(None, alias="status"),
+    fields: Optional[str] = Query(None, description="Comma-separated bet columns"),
+    current_user: dict = Depends(get_current_user)
+):
+    if export_format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {export_format}")
+    columns = _bet_columns(fields)
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_bets(current_user["id"], bet_status, columns, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="bets.{export_format}"'}
+    )
 
 @api_router.get("/stats")
 async def get_stats(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
-    wallet = await get_wallet_route(current_user)
-    
-    total_bets_row = await db_manager.fetch_one("SELECT COUNT(*) as count FROM bets_v2 WHERE user_id = ?", (user_id,))
-    total_bets = total_bets_row["count"] if total_bets_row else 0
-    
-    won_bets_row = await db_manager.fetch_one("SELECT COUNT(*) as count FROM bets_v2 WHERE user_id = ? AND status = 'won'", (user_id,))
-    won_bets = won_bets_row["count"] if won_bets_row else 0
-    
-    lost_bets_row = await db_manager.fetch_one("SELECT COUNT(*) as count FROM bets_v2 WHERE user_id = ? AND status = 'lost'", (user_id,))
-    lost_bets = lost_bets_row["count"] if lost_bets_row else 0
-    
-    pending_bets = total_bets - (won_bets + lost_bets)
-    win_rate = (won_bets / (won_bets + lost_bets) * 100) if (won_bets + lost_bets) > 0 else 0
+    row = await db_manager.fetch_one(USER_STATS_QUERY, (current_user["id"],))
+    if row is None:
+        row = {**await get_wallet_route(current_user), "total_bets": None}
+    counters = {
+        name: row.pop(name, None) or 0
+        for name in ("total_bets", "pending_bets", "won_bets", "lost_bets", "push_bets", "void_bets",
+                     "stats_wagered", "profit")
+    }
+    settled = counters["won_bets"] + counters["lost_bets"]
+    win_rate = (counters["won_bets"] / settled * 100) if settled > 0 else 0
     
     return {
-        "wallet": wallet,
-        "total_bets": total_bets,
-        "pending_bets": pending_bets,
-        "won_bets": won_bets,
-        "lost_bets": lost_bets,
+        "wallet": row,
+        "total_bets": counters["total_bets"],
+        "pending_bets": counters["pending_bets"],
+        "won_bets": counters["won_bets"],
+        "lost_bets": counters["lost_bets"],
+        "push_bets": counters["push_bets"],
+        "void_bets": counters["void_bets"],
+        "total_wagered": counters["stats_wagered"],
+        "profit": round(counters["profit"], 2),
         "win_rate": round(win_rate, 1)
     }
 
+@api_router.post("/settlement/run")
+async def run_settlement(current_user: dict = Depends(get_admin_user)):
+    return await settlement_engine.run()
+
 # --- PUBLIC / ODDS ROUTES ---
 
 @api_router.get("/sports")
@@ -448,70 +3297,235 @@ async def get_supported_sports():
         sports_list.append({"key": key, "title": info["title"], "group": info["group"]})
     return {"sports": sports_list, "count": len(sports_list)}
 
+def _parse_time_param(name: str, value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return _parse_expires_at(value).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO 8601 timestamp")
+
 @api_router.get("/odds/{sport_key}")
-async def get_odds_route(sport_key: str, markets: str = Query("h2h,spreads,totals")):
-    cache_key = f"odds_{sport_key}_{markets}"
-    
-    row = await db_manager.fetch_one("SELECT * FROM odds_cache_v2 WHERE cache_key = ?", (cache_key,))
-    if row and row.get("expires_at"):
-        expires_at = datetime.fromisoformat(row["expires_at"].replace('Z', '+00:00'))
-        if expires_at > datetime.now(timezone.utc):
-            cached_data = json.loads(row["data"]) if row["data"] else []
-            return {"odds": cached_data, "cached": True, "sport_key": sport_key}
+async def get_odds_route(
+    request: Request,
+    sport_key: str,
+    markets: str = Query("h2h,spreads,totals"),
+    since: Optional[int] = Query(None, description="Version from a previous response; only changed events are returned"),
+    bookmakers: Optional[str] = Query(None, description="Comma-separated bookmaker keys to keep"),
+    event_ids: Optional[str] = Query(None, description="Comma-separated event ids to keep"),
+    commence_after: Optional[str] = Query(None, description="Only events starting at or after this ISO time"),
+    commence_before: Optional[str] = Query(None, description="Only events starting before this ISO time"),
+    fields: Optional[str] = Query(None, description=f"Comma-separated event fields out of {', '.join(ODDS_EVENT_FIELDS)}")
+):
+    require_sport(sport_key)
+    markets = canonical_markets(markets)
+    projection = None
+    if any(param is not None for param in (bookmakers, event_ids, commence_after, commence_before, fields)):
+        field_list = None
+        if fields is not None:
+            field_list = ["id"] + [field for field in _split_csv(fields) if field != "id"]
+            unknown = [field for field in field_list if field not in ODDS_EVENT_FIELDS]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        projection = {
+            "event_ids": _split_csv(event_ids) if event_ids is not None else None,
+            "bookmakers": _split_csv(bookmakers) if bookmakers is not None else None,
+            "commence_after": _parse_time_param("commence_after", commence_after),
+            "commence_before": _parse_time_param("commence_before", commence_before),
+            "fields": field_list,
+        }
     
-    odds_data = await fetch_odds_from_api(sport_key, markets)
+    snapshot, cached = await get_odds_snapshot(sport_key, markets)
     
-    await db_manager.execute_write("""
-        INSERT OR REPLACE INTO odds_cache_v2 (cache_key, data, cached_at, expires_at)
-        VALUES (?, ?, ?, ?)
-    """, (
-        cache_key,
-        json.dumps(odds_data),
-        datetime.now(timezone.utc).isoformat(),
-        (datetime.now(timezone.utc) + timedelta(hours=24)).isoformat()
-    ))
+    if since is not None:
+        changes = odds_version_log(odds_cache_key(sport_key, markets)).changes_since(since)
+        if changes is not None:
+            events, removed = changes
+            if projection is not None:
+                wanted = set(projection["event_ids"]) & events if projection["event_ids"] is not None else events
+                odds = project_odds(snapshot, **{**projection, "event_ids": list(wanted)})
+            else:
+                odds = [event for event in snapshot.odds if event["id"] in events]
+            return {
+                "odds": odds,
+                "removed_events": sorted(removed),
+                "cached": cached,
+                "sport_key": sport_key,
+                "version": snapshot.version,
+                "since": since,
+                "full": False,
+            }
     
-    return {"odds": odds_data, "cached": False, "sport_key": sport_key}
-
-@api_router.post("/odds/refresh/{sport_key}")
-async def force_refresh_odds(sport_key: str, current_user: dict = Depends(get_current_user)):
-    ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME", "adminash")
+    if projection is not None:
+        # A projection is a pure function of the snapshot, so its ETag derives from the snapshot's;
+        # the flags that also go into the body are hashed with it
+        query = json.dumps({**projection, "cached": cached, "full": since is not None}, sort_keys=True)
+        etag = f'"{hashlib.blake2b((snapshot.etag + query).encode(), digest_size=16).hexdigest()}"'
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        body = {"odds": project_odds(snapshot, **projection), "cached": cached, "sport_key": sport_key,
+                "version": snapshot.version}
+        if since is not None:
+            body["full"] = True
+        return Response(content=dumps_bytes(body), media_type="application/json", headers={"ETag": etag})
     
-    if current_user["username"] not in [ADMIN_USERNAME, "ashadmin"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, 
-            detail="Admin privileges required to force refresh"
-        )
-
-    markets = "h2h,spreads,totals"
-    cache_key = f"odds_{sport_key}_{markets}"
+    if _etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": snapshot.etag})
     
-    await db_manager.execute_write("DELETE FROM odds_cache_v2 WHERE cache_key = ?", (cache_key,))
+    if cached and since is None:
+        return encoded_response(snapshot.variants, snapshot.etag, request.headers.get("accept-encoding"))
     
-    odds_data = await fetch_odds_from_api(sport_key, markets)
+    body = {"odds": snapshot.odds, "cached": cached, "sport_key": sport_key, "version": snapshot.version}
+    if since is not None:
+        body["full"] = True
+    # This body differs from the snapshot's precomputed one, so its ETag also covers the flags that differ
+    content = dumps_bytes(body)
+    query = json.dumps({"cached": cached, "full": since is not None}, sort_keys=True)
+    etag = f'"{hashlib.blake2b((snapshot.etag + query).encode(), digest_size=16).hexdigest()}"'
+    return Response(content=content, media_type="application/json", headers={"ETag": etag})
+
+@api_router.post("/odds/refresh/{sport_key}")
+async def force_refresh_odds(sport_key: str, current_user: dict = Depends(get_admin_user)):
+    require_sport(sport_key)
+    markets = ODDS_POLL_MARKETS
+    cache_key = odds_cache_key(sport_key, markets)
     
-    await db_manager.execute_write("""
-        INSERT OR REPLACE INTO odds_cache_v2 (cache_key, data, cached_at, expires_at)
-        VALUES (?, ?, ?, ?)
-    """, (
-        cache_key,
-        json.dumps(odds_data),
-        datetime.now(timezone.utc).isoformat(),
-        (datetime.now(timezone.utc) + timedelta(hours=24)).isoformat()
-    ))
+    # store_odds replaces the cache row, so a failed refresh leaves the current odds in place
+    try:
+        snapshot = await refresh_odds(sport_key, markets, cache_key)
+    except OddsFetchError:
+        raise HTTPException(status_code=503, detail="Odds provider unavailable")
     
-    return {"odds": odds_data, "refreshed": True, "sport_key": sport_key, "games_count": len(odds_data)}
+    return {
+        "odds": snapshot.odds,
+        "refreshed": True,
+        "sport_key": sport_key,
+        "games_count": len(snapshot.odds),
+        "version": snapshot.version,
+    }
+
+@api_router.get("/odds/{sport_key}/events/{event_id}")
+async def get_event_odds_route(sport_key: str, event_id: str, markets: str = Query("h2h,spreads,totals")):
+    event = await load_event_odds(event_id, _split_csv(canonical_markets(markets)))
+    if event is None or event["sport_key"] != sport_key:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return {"event": event, "sport_key": sport_key}
+
+@api_router.get("/odds/{sport_key}/events/{event_id}/history")
+async def get_event_history_route(
+    sport_key: str,
+    event_id: str,
+    bookmaker: Optional[str] = None,
+    market: Optional[str] = None,
+    start: Optional[int] = Query(None, description="Unix seconds"),
+    end: Optional[int] = Query(None, description="Unix seconds")
+):
+    series = await load_event_history(event_id, bookmaker, market, start, end)
+    return {"event_id": event_id, "sport_key": sport_key, "series": series}
+
+@api_router.get("/odds/{sport_key}/bookmakers/{bookmaker}")
+async def get_bookmaker_odds_route(sport_key: str, bookmaker: str, markets: str = Query("h2h,spreads,totals")):
+    odds_data = await load_bookmaker_odds(sport_key, bookmaker, _split_csv(canonical_markets(markets)))
+    return {"odds": odds_data, "sport_key": sport_key, "bookmaker": bookmaker}
+
+async def get_pricing(sport_key: str) -> OddsPricing:
+    require_sport(sport_key)
+    snapshot, _ = await get_odds_snapshot(sport_key, ODDS_POLL_MARKETS)
+    return snapshot.pricing
+
+@api_router.get("/pricing/{sport_key}")
+async def get_pricing_route(request: Request, sport_key: str):
+    pricing = await get_pricing(sport_key)
+    if _etag_matches(request.headers.get("if-none-match"), pricing.etag):
+        return Response(status_code=304, headers={"ETag": pricing.etag})
+    return encoded_response(pricing.variants, pricing.etag, request.headers.get("accept-encoding"))
+
+@api_router.get("/pricing/{sport_key}/events/{event_id}")
+async def get_event_pricing_route(sport_key: str, event_id: str):
+    pricing = await get_pricing(sport_key)
+    if event_id not in pricing.events:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return {"event": pricing.events[event_id], "sport_key": sport_key}
+
+@api_router.get("/signals")
+async def get_signals(
+    signal_type: Optional[str] = Query(None, alias="type", description="arbitrage or positive_ev"),
+    sports: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    if signal_type is not None and signal_type not in ("arbitrage", "positive_ev"):
+        raise HTTPException(status_code=400, detail=f"Unknown signal type: {signal_type}")
+    sport_keys = set(_split_csv(sports)) if sports else None
+    signals = [
+        signal for signal in signal_scanner.ranked()
+        if (signal_type is None or signal["type"] == signal_type)
+        and (sport_keys is None or signal["sport_key"] in sport_keys)
+    ]
+    return {"signals": signals[:limit], "count": len(signals)}
 
 @api_router.get("/odds/all/preview")
-async def get_all_odds_preview():
-    all_odds = {}
-    for sport_key in list(SUPPORTED_SPORTS.keys())[:4]:
-        odds_response = await get_odds_route(sport_key, "h2h")
-        all_odds[sport_key] = {
-            "title": SUPPORTED_SPORTS[sport_key]["title"],
-            "games": odds_response.get("odds", [])[:3]
+async def get_all_odds_preview(
+    request: Request,
+    since: Optional[int] = Query(None, description="Version from a previous response; only changed sports are returned")
+):
+    missing = []
+    for sport_key in PREVIEW_SPORTS:
+        cache_key = odds_cache_key(sport_key, ODDS_POLL_MARKETS)
+        snapshot, stale = odds_memory_cache.get(cache_key)
+        if snapshot is None:
+            missing.append(sport_key)
+            continue
+        if stale:
+            schedule_odds_revalidation(sport_key, ODDS_POLL_MARKETS, cache_key)
+        entry = odds_preview.get(sport_key)
+        if entry is None or entry["source"] is not snapshot:
+            materialize_preview(snapshot)
+
+    if missing:
+        results = await asyncio.gather(
+            *(get_odds_snapshot(sport_key, ODDS_POLL_MARKETS) for sport_key in missing), return_exceptions=True
+        )
+        for sport_key, result in zip(missing, results):
+            if isinstance(result, (HTTPException, OddsFetchError)):
+                logger.warning(f"Odds preview for {sport_key} unavailable: {result}")
+                if sport_key not in odds_preview:
+                    blank_preview(sport_key)
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            snapshot, _ = result
+            entry = odds_preview.get(sport_key)
+            if entry is None or entry["source"] is not snapshot:
+                materialize_preview(snapshot)
+
+    if since is not None:
+        return {
+            "preview": {
+                sport_key: odds_preview[sport_key]["preview"]
+                for sport_key in PREVIEW_SPORTS if odds_preview[sport_key]["version"] > since
+            },
+            "version": preview_version(),
+            "since": since,
+            "full": False,
         }
-    return {"preview": all_odds}
+
+    variants, etag = render_preview()
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return encoded_response(variants, etag, request.headers.get("accept-encoding"))
+
+@api_router.get("/stream/odds")
+async def stream_odds(request: Request, sports: Optional[str] = None):
+    sport_keys = _split_csv(sports) if sports else list(SUPPORTED_SPORTS.keys())
+    unknown = [sport_key for sport_key in sport_keys if sport_key not in SUPPORTED_SPORTS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unsupported sports: {', '.join(unknown)}")
+    subscriber = odds_broadcaster.subscribe(sport_keys)
+    return StreamingResponse(
+        _odds_event_stream(request, subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # ==================== APP SETUP ====================
 
@@ -527,9 +3541,61 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def startup():
+    global odds_http_client
+    odds_http_client = create_odds_http_client()
     await init_db()
+    db_manager.start()
+    password_hasher.start()
+    if ODDS_POLLER_ENABLED:
+        odds_poller.start()
+    maintenance.start()
+    odds_broadcaster.start()
     logger.info("Viva Picks API started with User Auth")
 
 @app.on_event("shutdown")
 async def shutdown():
+    await odds_poller.stop()
+    await maintenance.stop()
+    await odds_broadcaster.stop()
+    password_hasher.stop()
+    await db_manager.stop()
+    if odds_http_client is not None:
+        await odds_http_client.aclose()
+    db_manager.close()
     logger.info("Viva Picks API shutdown")
+
+if __name__ == "__main__":
+    import sys
+
+    async def _check_indexes_command() -> int:
+        await init_db()
+        failures = await check_indexes()
+        for failure in failures:
+            print(f"FAIL {failure}")
+        print(f"{len(HOT_QUERIES) - len(failures)}/{len(HOT_QUERIES)} hot queries use their index")
+        db_manager.close()
+        return 1 if failures else 0
+
+    async def _rebuild_stats_command() -> int:
+        await init_db()
+        users = await rebuild_user_stats()
+        print(f"Rebuilt stats for {users} users")
+        db_manager.close()
+        return 0
+
+    async def _vacuum_command() -> int:
+        # Offline only: a full VACUUM rewrites the file, and switches older files to incremental vacuum
+        await init_db()
+        await db_manager.write_pool.run(lambda conn: (
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL"), conn.execute("VACUUM").fetchall()
+        ))
+        print(f"Vacuumed {DB_PATH}")
+        db_manager.close()
+        return 0
+
+    commands = {"check-indexes": _check_indexes_command, "rebuild-stats": _rebuild_stats_command,
+                "vacuum": _vacuum_command}
+    if len(sys.argv) == 2 and sys.argv[1] in commands:
+        sys.exit(asyncio.run(commands[sys.argv[1]]()))
+    print(f"usage: python server.py {{{','.join(commands)}}}")
+    sys.exit(2)
@@ -0,0 +1,30 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+# server reads its configuration at import time, so point it at a throwaway database first
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="viva-tests-"), "test.db")
+os.environ["ODDS_POLLER_ENABLED"] = "0"
+os.environ["PASSWORD_HASH_WORKERS"] = "0"
+os.environ["PASSWORD_BCRYPT_ROUNDS"] = "4"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import server  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.fixture
+def auth_headers(client):
+    response = client.post("/api/register", json={"username": f"user-{uuid.uuid4().hex[:8]}", "password": "secret"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+import server
+
+
+def add_event(client, commence_time: datetime) -> str:
+    event_id = f"event-{uuid.uuid4().hex[:8]}"
+    client.portal.call(server.db_manager.execute_write, """
+        INSERT INTO odds_events (event_id, sport_key, sport_title, commence_time, home_team, away_team, updated_at)
+        VALUES (?, 'basketball_nba', 'NBA', ?, 'Home', 'Away', ?)
+    """, (event_id, commence_time.isoformat().replace("+00:00", "Z"), commence_time.isoformat()))
+    client.portal.call(server.db_manager.execute_write, """
+        INSERT INTO odds_outcomes (event_id, bookmaker, market, outcome, price, point, updated_at)
+        VALUES (?, 'draftkings', 'h2h', 'Home', -110, NULL, ?)
+    """, (event_id, commence_time.isoformat()))
+    return event_id
+
+
+def bet_payload(event_id: str, **overrides):
+    return {
+        "event_id": event_id, "sport_key": "basketball_nba", "sport_title": "NBA",
+        "home_team": "Home", "away_team": "Away", "selected_team": "Home", "bet_type": "h2h",
+        "odds": -110, "amount": 10, "potential_payout": 1000000, **overrides,
+    }
+
+
+def test_rejects_bets_on_started_or_unknown_events(client, auth_headers):
+    started = add_event(client, datetime(2020, 1, 1, tzinfo=timezone.utc))
+    for event_id in (started, "no-such-event"):
+        response = client.post("/api/bets", json=bet_payload(event_id), headers=auth_headers)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Event or line is not open for betting"
+    assert client.get("/api/wallet", headers=auth_headers).json()["balance"] == 1000.0
+
+
+def test_rejects_odds_no_bookmaker_posts(client, auth_headers):
+    event_id = add_event(client, datetime.now(timezone.utc) + timedelta(hours=2))
+    for overrides in ({"odds": 100000}, {"selected_team": "Away"}, {"point": -3.5}):
+        response = client.post("/api/bets", json=bet_payload(event_id, **overrides), headers=auth_headers)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Event or line is not open for betting"
+    assert client.get("/api/wallet", headers=auth_headers).json()["balance"] == 1000.0
+
+
+def test_settlement_pays_server_computed_payout(client, auth_headers, tmp_path):
+    event_id = add_event(client, datetime.now(timezone.utc) + timedelta(hours=2))
+    response = client.post("/api/bets", json=bet_payload(event_id), headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["new_balance"] == 990.0
+
+    bet = client.get("/api/bets", headers=auth_headers).json()["bets"][0]
+    assert bet["potential_payout"] == 19.09
+    # A client-supplied payout already stored by an older build is not honoured either
+    client.portal.call(server.db_manager.execute_write,
+                       "UPDATE bets_v2 SET potential_payout = 1000000, commence_time = '2020-01-01T00:00:00Z' WHERE id = ?",
+                       (bet["id"],))
+
+    results = tmp_path / "results.json"
+    results.write_text(json.dumps([{"event_id": event_id, "sport_key": "basketball_nba", "home_score": 101, "away_score": 99}]))
+    engine = server.SettlementEngine(server.FileResultsSource(str(results)))
+    client.portal.call(engine.run)
+
+    assert client.get("/api/wallet", headers=auth_headers).json()["balance"] == 1009.09
+    stats = client.get("/api/stats", headers=auth_headers).json()
+    assert stats["won_bets"] == 1
+    assert stats["profit"] == 9.09
+
+
+def test_concurrent_bets_cannot_overspend(client, auth_headers):
+    event_id = add_event(client, datetime.now(timezone.utc) + timedelta(hours=2))
+
+    async def place_all():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(
+                http.post("/api/bets", json=bet_payload(event_id, amount=100), headers=auth_headers) for _ in range(20)
+            ))
+
+    responses = client.portal.call(place_all)
+    assert sorted(response.status_code for response in responses) == [200] * 10 + [400] * 10
+    assert all(response.json()["detail"] == "Insufficient balance" for response in responses if response.status_code == 400)
+    assert client.get("/api/wallet", headers=auth_headers).json()["balance"] == 0
+    assert len(client.get("/api/bets", headers=auth_headers).json()["bets"]) == 10
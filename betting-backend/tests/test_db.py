@@ -0,0 +1,113 @@
+import asyncio
+import sqlite3
+import time
+import uuid
+
+import server
+
+
+def local_manager(path, monkeypatch, **kwargs) -> server.DatabaseManager:
+    monkeypatch.setattr(server, "DB_PATH", path)
+    return server.DatabaseManager(
+        connect=lambda: sqlite3.connect(str(path), timeout=5, check_same_thread=False), **kwargs
+    )
+
+
+def test_lone_write_skips_the_batch_delay(tmp_path, monkeypatch):
+    async def run():
+        db = local_manager(tmp_path / "primary.db", monkeypatch)
+        db.coalescer = server.WriteCoalescer(db.write_pool, 64, 5.0)
+        await db.execute_write("CREATE TABLE t (x INTEGER CHECK (x < 10))")
+        started = time.monotonic()
+        await db.execute_write("INSERT INTO t VALUES (1)")
+        elapsed = time.monotonic() - started
+        await db.stop()
+        db.close()
+        return elapsed
+
+    assert asyncio.run(run()) < 1.0
+
+
+def test_batched_writes_fail_independently(tmp_path, monkeypatch):
+    async def run():
+        db = local_manager(tmp_path / "primary.db", monkeypatch)
+        await db.execute_write("CREATE TABLE t (x INTEGER CHECK (x < 10))")
+        outcomes = await asyncio.gather(
+            *(db.execute_returning("INSERT INTO t VALUES (?) RETURNING x", (x,)) for x in (1, 20, 3)),
+            return_exceptions=True
+        )
+        rows = await db.execute("SELECT x FROM t ORDER BY x")
+        stats = db.coalescer.stats()
+        await db.stop()
+        db.close()
+        return outcomes, rows, stats
+
+    outcomes, rows, stats = asyncio.run(run())
+    assert outcomes[0] == [{"x": 1}] and outcomes[2] == [{"x": 3}]
+    assert isinstance(outcomes[1], Exception)
+    assert rows == [{"x": 1}, {"x": 3}]
+    assert stats["max_batch"] == 3
+
+
+def test_replica_routing(tmp_path, monkeypatch):
+    replica_path = tmp_path / "replica.db"
+
+    def copy_primary(conn):
+        # Stands in for an embedded replica's sync: bring the replica file up to the primary
+        source = sqlite3.connect(str(tmp_path / "primary.db"))
+        target = sqlite3.connect(str(replica_path))
+        source.backup(target)
+        source.close()
+        target.close()
+
+    async def run():
+        db = local_manager(
+            tmp_path / "primary.db", monkeypatch,
+            replica_connect=lambda: sqlite3.connect(str(replica_path), check_same_thread=False),
+            replica_sync=copy_primary,
+        )
+        await db.execute_write("CREATE TABLE bets (user_id TEXT)")
+        # Never synced: the replica may not even have the schema
+        assert await db.execute("SELECT COUNT(*) AS n FROM bets") == [{"n": 0}]
+        assert db.routed["primary_stale"] == 1
+        await db.sync_replica()
+
+        server.current_principal.set("writer")
+        await db.execute_write("INSERT INTO bets VALUES ('writer')")
+        # The writer reads its own write from the primary; everyone else reads the lagging replica
+        assert await db.execute("SELECT COUNT(*) AS n FROM bets") == [{"n": 1}]
+        assert db.routed["primary_read_your_writes"] == 1
+        server.current_principal.set("reader")
+        assert await db.execute("SELECT COUNT(*) AS n FROM bets") == [{"n": 0}]
+        assert db.routed["replica"] == 1
+
+        await db.sync_replica()
+        server.current_principal.set("writer")
+        assert await db.execute("SELECT COUNT(*) AS n FROM bets") == [{"n": 1}]
+        assert db.routed["replica"] == 2
+
+        monkeypatch.setattr(server, "DB_REPLICA_MAX_STALENESS", 0.0)
+        await db.execute("SELECT COUNT(*) AS n FROM bets")
+        assert db.routed["primary_stale"] == 2
+        assert await db.execute("SELECT 1 AS one", primary=True) == [{"one": 1}]
+        assert db.routed == {"replica": 2, "primary_read_your_writes": 1, "primary_stale": 2}
+        await db.stop()
+        db.close()
+
+    asyncio.run(run())
+
+
+def test_metrics_are_admin_only(client, auth_headers, monkeypatch):
+    assert client.get("/api/metrics").status_code in (401, 403)
+    assert client.get("/api/metrics", headers=auth_headers).status_code == 403
+
+    admin = f"admin-{uuid.uuid4().hex[:8]}"
+    monkeypatch.setenv("ADMIN_USERNAME", admin)
+    token = client.post("/api/register", json={"username": admin, "password": "secret"}).json()["access_token"]
+    response = client.get("/api/metrics", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert "db" in response.json()
+
+
+def test_hot_queries_use_their_indexes(client):
+    assert client.portal.call(server.check_indexes) == []
@@ -0,0 +1,162 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import server
+
+
+def make_event(event_id: str) -> dict:
+    commence = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat().replace("+00:00", "Z")
+    return {
+        "id": event_id, "sport_key": "basketball_ncaab", "sport_title": "NCAAB", "commence_time": commence,
+        "home_team": "Home", "away_team": "Away",
+        "bookmakers": [{"key": "draftkings", "title": "DraftKings", "markets": [
+            {"key": "h2h", "outcomes": [{"name": "Home", "price": -120}, {"name": "Away", "price": 100}]},
+        ]}],
+    }
+
+
+def test_upstream_failure_keeps_stored_odds(client, monkeypatch):
+    sport_key, markets = "basketball_ncaab", "h2h"
+    cache_key = server.odds_cache_key(sport_key, markets)
+    feed = [make_event("ncaab-1")]
+
+    async def odds_api_get(path, params, sport_key):
+        return feed
+
+    monkeypatch.setattr(server, "ODDS_API_KEY", "test-key")
+    monkeypatch.setattr(server, "_odds_api_get", odds_api_get)
+    assert [event["id"] for event in client.get(f"/api/odds/{sport_key}?markets={markets}").json()["odds"]] == ["ncaab-1"]
+
+    # Age the stored refresh past its stale window and drop the in-memory copy, then take the provider down
+    client.portal.call(server.db_manager.execute_write,
+                       "UPDATE odds_cache_v2 SET expires_at = '2020-01-01T00:00:00+00:00' WHERE cache_key = ?", (cache_key,))
+    monkeypatch.setattr(server, "odds_memory_cache", server.OddsMemoryCache(16, 1 << 20))
+    feed = None
+
+    body = client.get(f"/api/odds/{sport_key}?markets={markets}").json()
+    assert [event["id"] for event in body["odds"]] == ["ncaab-1"]
+    assert body["cached"] is True
+    row = client.portal.call(server.db_manager.fetch_one, "SELECT expires_at FROM odds_cache_v2 WHERE cache_key = ?", (cache_key,))
+    assert row["expires_at"] == "2020-01-01T00:00:00+00:00"
+    stored = client.portal.call(server.load_odds, sport_key, [markets])
+    assert stored[0]["bookmakers"]
+
+    poller = server.OddsPoller([sport_key], markets)
+    client.portal.call(poller._poll, sport_key)
+    assert poller.errors == 1
+    assert poller.next_run[sport_key] - time.monotonic() <= server.ODDS_POLL_ERROR_SECONDS
+
+
+def test_upstream_failure_without_stored_odds_is_unavailable(client, monkeypatch):
+    async def odds_api_get(path, params, sport_key):
+        return None
+
+    monkeypatch.setattr(server, "ODDS_API_KEY", "test-key")
+    monkeypatch.setattr(server, "_odds_api_get", odds_api_get)
+    assert client.get("/api/odds/americanfootball_nfl?markets=totals").status_code == 503
+
+
+def test_every_dashboard_sport_is_served(client):
+    for sport_key in ("baseball_mlb", "americanfootball_ncaaf", "soccer_epl", "soccer_germany_bundesliga",
+                      "soccer_usa_mls", "soccer_uefa_champs_league"):
+        assert client.get(f"/api/odds/{sport_key}").status_code == 200
+    assert client.get("/api/odds/cricket_ipl").status_code == 404
+
+
+def test_preview_survives_one_sport_being_unavailable(client, monkeypatch):
+    async def odds_api_get(path, params, sport_key):
+        return None if sport_key == "americanfootball_nfl" else []
+
+    monkeypatch.setattr(server, "ODDS_API_KEY", "test-key")
+    monkeypatch.setattr(server, "_odds_api_get", odds_api_get)
+    monkeypatch.setattr(server, "odds_memory_cache", server.OddsMemoryCache(16, 1 << 20))
+    monkeypatch.setattr(server, "odds_preview", {})
+    monkeypatch.setattr(server, "_preview_rendered", None)
+    client.portal.call(server.db_manager.execute_write, "DELETE FROM odds_cache_v2 WHERE cache_key = ?",
+                       (server.odds_cache_key("americanfootball_nfl", server.ODDS_POLL_MARKETS),))
+
+    response = client.get("/api/odds/all/preview")
+    assert response.status_code == 200
+    preview = response.json()["preview"]
+    assert set(preview) == set(server.PREVIEW_SPORTS)
+    assert preview["americanfootball_nfl"] == {"title": "NFL", "games": []}
+
+
+def test_empty_feed_removes_the_sports_events(client, monkeypatch):
+    sport_key, markets = "icehockey_nhl", "h2h"
+    cache_key = server.odds_cache_key(sport_key, markets)
+    event = {**make_event("nhl-1"), "sport_key": sport_key}
+    client.portal.call(server.store_odds, sport_key, markets, cache_key, [event])
+    client.portal.call(server.store_odds, sport_key, markets, cache_key, [])
+
+    assert client.portal.call(server.load_odds, sport_key, [markets]) == []
+    for table in ("odds_events", "odds_outcomes"):
+        remaining = client.portal.call(server.db_manager.fetch_one,
+                                       f"SELECT COUNT(*) AS n FROM {table} WHERE event_id = 'nhl-1'")
+        assert remaining["n"] == 0
+    taken_down = client.portal.call(server.db_manager.fetch_one,
+                                    "SELECT COUNT(*) AS n FROM odds_price_history WHERE event_id = 'nhl-1' AND price IS NULL")
+    assert taken_down["n"] > 0
+
+    # Another worker, or this one after a reload, starts from the stored row rather than this process's memory
+    monkeypatch.setattr(server, "odds_memory_cache", server.OddsMemoryCache(16, 1 << 20))
+    body = client.get(f"/api/odds/{sport_key}?markets={markets}").json()
+    assert body["odds"] == [] and body["cached"] is True
+
+
+def test_sweeper_expires_evicts_and_vacuums_incrementally(client, monkeypatch):
+    client.portal.call(server.db_manager.execute_transaction, lambda conn: conn.executemany(
+        "INSERT OR REPLACE INTO odds_cache_v2 (cache_key, data, cached_at, expires_at) VALUES (?, ?, ?, ?)",
+        [(f"expired-{i}", "x" * 4000, "2020-01-01T00:00:00+00:00", "2020-01-01T00:10:00+00:00") for i in range(200)]
+        + [(f"live-{i}", None, f"2999-01-01T00:00:0{i}+00:00", "2999-01-02T00:00:00+00:00") for i in range(3)]
+    ))
+    monkeypatch.setattr(server, "ODDS_CACHE_MAX_ROWS", 2)
+    result = client.portal.call(server.sweep_odds_cache)
+    assert result["expired"] >= 200
+    assert result["vacuumed_pages"] > 0
+    rows = client.portal.call(server.db_manager.execute, "SELECT cache_key FROM odds_cache_v2 ORDER BY cache_key")
+    assert [row["cache_key"] for row in rows] == ["live-1", "live-2"]
+
+
+def test_versions_and_etags_are_per_market_set(client, monkeypatch):
+    sport_key = "basketball_nba"
+    feeds = {"h2h": [make_event("nba-1")], "h2h,spreads": [make_event("nba-1"), make_event("nba-2")]}
+
+    async def odds_api_get(path, params, sport_key):
+        return feeds[params["markets"]]
+
+    monkeypatch.setattr(server, "ODDS_API_KEY", "test-key")
+    monkeypatch.setattr(server, "_odds_api_get", odds_api_get)
+    first = client.get(f"/api/odds/{sport_key}?markets=h2h")
+    assert first.json()["cached"] is False
+    cached = client.get(f"/api/odds/{sport_key}?markets=h2h")
+    assert cached.json()["cached"] is True
+    assert first.headers["etag"] != cached.headers["etag"]
+
+    time.sleep(0.01)
+    newer = client.get(f"/api/odds/{sport_key}?markets=h2h,spreads").json()
+    # A version from the other market set is unknown here, so the response is a full payload
+    body = client.get(f"/api/odds/{sport_key}?markets=h2h&since={newer['version']}").json()
+    assert body["full"] is True
+    assert [event["id"] for event in body["odds"]] == ["nba-1"]
+
+
+def test_etag_depends_only_on_the_stored_odds(client, monkeypatch):
+    sport_key, markets = "basketball_ncaab", "h2h,totals"
+    cache_key = server.odds_cache_key(sport_key, markets)
+    event = make_event("ncaab-etag")
+    # Feed order and int prices differ from how the normalized tables hand the same lines back
+    event["bookmakers"][0]["markets"].insert(0, {"key": "totals", "outcomes": [
+        {"name": "Under", "price": -110, "point": 150}, {"name": "Over", "price": -110, "point": 150},
+    ]})
+    first = client.portal.call(server.store_odds, sport_key, markets, cache_key, [event])
+    time.sleep(0.01)
+    second = client.portal.call(server.store_odds, sport_key, markets, cache_key, [event])
+    assert second.version > first.version
+    assert second.etag == first.etag
+
+    # Another worker rebuilds the same refresh from the stored row, byte for byte
+    monkeypatch.setattr(server, "odds_memory_cache", server.OddsMemoryCache(16, 1 << 20))
+    response = client.get(f"/api/odds/{sport_key}?markets={markets}", headers={"Accept-Encoding": "identity"})
+    assert response.headers["etag"] == second.etag
+    assert response.content == second.variants["identity"]
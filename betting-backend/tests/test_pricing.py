@@ -0,0 +1,19 @@
+import server
+
+
+def test_price_market_handles_empty_feeds():
+    event = {"id": "e1", "home_team": "Home", "away_team": "Away", "bookmakers": []}
+    for market in server.PRICING_MARKETS:
+        assert server.price_market([], market, []) == []
+        assert server.price_market([event], market, []) == [None]
+
+
+def test_pricing_routes_serve_an_empty_feed(client, monkeypatch):
+    async def empty_feed(sport_key, markets):
+        return []
+
+    monkeypatch.setattr(server, "fetch_odds_from_api", empty_feed)
+    sport_key = "icehockey_nhl"
+    assert client.get(f"/api/odds/{sport_key}").json()["odds"] == []
+    assert client.get(f"/api/pricing/{sport_key}").status_code == 200
+    assert client.get("/api/odds/all/preview").status_code == 200